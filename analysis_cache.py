@@ -0,0 +1,169 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+# Disk-backed cache of LLM analyses.
+# Entries are keyed on the normalized case description, the IDs of the
+# provisions retrieved for it, and a namespace built from the model name,
+# prompt template and knowledge base. When any of those change, the namespace
+# changes and old entries become unreachable. Several processes with different
+# settings may share one file, so other namespaces are never purged outright;
+# they age out through the TTL and LRU eviction like any other entry.
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def normalize_case_description(text):
+    return " ".join(TOKEN_PATTERN.findall(text.lower()))
+
+def fingerprint(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+# Jaccard similarity between two token sets
+def token_similarity(tokens_a, tokens_b):
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+class AnalysisCache:
+    def __init__(
+        self,
+        path,
+        namespace,
+        max_entries=5000,
+        ttl_seconds=7 * 24 * 3600,
+        similarity_threshold=None,
+        similarity_candidates=200
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.similarity_candidates = similarity_candidates
+        self.stats = {"hits": 0, "similar_hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                provision_key TEXT NOT NULL,
+                tokens TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS analyses_lookup ON analyses (namespace, provision_key, last_used)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_lru ON analyses (last_used)")
+        with self._lock, self._conn:
+            self._evict(time.time())
+
+    def _key(self, normalized, provision_key):
+        return fingerprint(self.namespace, provision_key, normalized)
+
+    @staticmethod
+    def _provision_key(provision_ids):
+        return json.dumps(sorted(provision_ids))
+
+    def get(self, case_description, provision_ids):
+        normalized = normalize_case_description(case_description)
+        provision_key = self._provision_key(provision_ids)
+        now = time.time()
+        expires_before = now - self.ttl_seconds
+
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT key, analysis FROM analyses WHERE key = ? AND created_at >= ?",
+                (self._key(normalized, provision_key), expires_before)
+            ).fetchone()
+
+            if row is None and self.similarity_threshold is not None:
+                row = self._find_similar(normalized, provision_key, expires_before)
+                if row is not None:
+                    self.stats["similar_hits"] += 1
+
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            self.stats["hits"] += 1
+            self._conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (now, row[0]))
+            return row[1]
+
+    # Best paraphrase match among recent entries that retrieved the same provisions
+    def _find_similar(self, normalized, provision_key, expires_before):
+        query_tokens = set(normalized.split())
+        candidates = self._conn.execute(
+            """
+            SELECT key, analysis, tokens FROM analyses
+            WHERE namespace = ? AND provision_key = ? AND created_at >= ?
+            ORDER BY last_used DESC LIMIT ?
+            """,
+            (self.namespace, provision_key, expires_before, self.similarity_candidates)
+        ).fetchall()
+
+        best, best_score = None, self.similarity_threshold
+        for key, analysis, tokens in candidates:
+            score = token_similarity(query_tokens, set(tokens.split()))
+            if score >= best_score:
+                best, best_score = (key, analysis), score
+        return best
+
+    def put(self, case_description, provision_ids, analysis):
+        normalized = normalize_case_description(case_description)
+        provision_key = self._provision_key(provision_ids)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self._key(normalized, provision_key),
+                    self.namespace,
+                    provision_key,
+                    " ".join(sorted(set(normalized.split()))),
+                    analysis,
+                    now,
+                    now
+                )
+            )
+            self._evict(now)
+
+    # Drop expired entries, then least recently used ones above the size cap
+    def _evict(self, now):
+        cursor = self._conn.execute(
+            "DELETE FROM analyses WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        evicted = cursor.rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        if count > self.max_entries:
+            cursor = self._conn.execute(
+                "DELETE FROM analyses WHERE key IN (SELECT key FROM analyses ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            evicted += cursor.rowcount
+        self.stats["evictions"] += evicted
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM analyses")
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import time
+from resources import (
+    legal_analysis_template,
+    get_analysis_chain,
+    get_analysis_cache,
+    prepare_retrieval_backend,
+    get_metrics_registry
+)
+from legal_advisor import retrieve_legal_provisions_batch, prepare_analysis_inputs, record_token_usage, save_case_history
+from tracing import trace_request, span, annotate, record_span
+
+# Headless batch analysis.
+# Cases are read from CSV or JSONL, provisions are retrieved for a whole chunk
+# of cases in one Chroma query, and LLM calls run concurrently on a bounded pool
+# of workers. Each result is appended to a JSONL output file as soon as it
+# completes, so an interrupted run can be resumed by running it again.
+
+RETRYABLE_ERRORS = {"RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError"}
+
+def read_cases(path, text_column="case_description", id_column="id"):
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    cases = []
+    for index, row in enumerate(rows):
+        text = (row.get(text_column) or "").strip()
+        if not text:
+            continue
+        case_id = str(row.get(id_column) or f"row-{index}")
+        cases.append({"id": case_id, "case_description": text})
+    return cases
+
+# IDs of cases already analysed successfully in a previous run
+def load_completed_ids(output_path):
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial line from a crash mid-write
+            if "error" not in record:
+                completed.add(record["id"])
+    return completed
+
+# Cut off a line left half-written by a crash, so the next appended record starts on its own line
+def truncate_partial_line(output_path, block_size=65536):
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def is_rate_limited(error):
+    return _status_code(error) == 429 or type(error).__name__ == "RateLimitError"
+
+def is_retryable(error):
+    status = _status_code(error)
+    return (
+        is_rate_limited(error)
+        or (status is not None and status >= 500)
+        or type(error).__name__ in RETRYABLE_ERRORS
+        or isinstance(error, (asyncio.TimeoutError, ConnectionError))
+    )
+
+class BatchAnalyzer:
+    def __init__(
+        self,
+        output_path,
+        concurrency=8,
+        retrieval_batch_size=64,
+        top_n=8,
+        max_retries=5,
+        base_delay=1.0,
+        max_delay=60.0,
+        save_history=False
+    ):
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.retrieval_batch_size = retrieval_batch_size
+        self.top_n = top_n
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.save_history = save_history
+        self.stats = {"completed": 0, "failed": 0, "skipped": 0, "cached": 0, "retries": 0}
+        # When the provider rate-limits us, every worker waits until this time
+        self._resume_at = 0.0
+
+    async def _wait_for_rate_limit(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # Only the calls themselves count towards the llm stage; backoff and
+    # rate-limit waits do not, and the number of retries is recorded on the trace
+    async def _invoke_with_retries(self, chain, inputs):
+        for attempt in range(self.max_retries + 1):
+            annotate(retries=attempt)
+            await self._wait_for_rate_limit()
+            try:
+                with span("llm"):
+                    return await chain.ainvoke(inputs)
+            except Exception as error:
+                if attempt == self.max_retries or not is_retryable(error):
+                    raise
+                delay = _retry_after(error)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                if is_rate_limited(error):
+                    self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+
+    # Packing and the SQLite cache run off the event loop
+    async def _analyze(self, case, provisions, metrics):
+        inputs, provision_ids = await asyncio.to_thread(
+            prepare_analysis_inputs, case["case_description"], provisions, metrics
+        )
+        cache = get_analysis_cache()
+        analysis = await asyncio.to_thread(cache.get, case["case_description"], provision_ids)
+        cached = analysis is not None
+        if not cached:
+            response = await self._invoke_with_retries(get_analysis_chain(), inputs)
+            analysis = response.content
+            record_token_usage(response.usage_metadata, legal_analysis_template.format(**inputs), analysis)
+            await asyncio.to_thread(cache.put, case["case_description"], provision_ids, analysis)
+        return analysis, cached
+
+    async def _produce(self, cases, queue):
+        for start in range(0, len(cases), self.retrieval_batch_size):
+            chunk = cases[start:start + self.retrieval_batch_size]
+            started = time.perf_counter()
+            batch = await asyncio.to_thread(
+                retrieve_legal_provisions_batch,
+                [case["case_description"] for case in chunk],
+                self.top_n
+            )
+            # Each case's trace is charged an equal share of the batched retrieval
+            retrieval_seconds = (time.perf_counter() - started) / len(chunk)
+            for case, provisions in zip(chunk, batch):
+                await queue.put((case, provisions, retrieval_seconds))
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def _work(self, queue, output, write_lock, on_result):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            case, provisions, retrieval_seconds = item
+            started = time.perf_counter()
+            record = {"id": case["id"], "case_description": case["case_description"]}
+            try:
+                metrics = {}
+                with trace_request(get_metrics_registry(), "batch"):
+                    record_span("retrieval", retrieval_seconds)
+                    analysis, cached = await self._analyze(case, provisions, metrics)
+                record.update({
+                    "analysis": analysis,
+                    "provisions": [p["provision"] for p in provisions],
+                    "cached": cached,
+                    "prompt_tokens_before": metrics["prompt_tokens_before"],
+                    "prompt_tokens_after": metrics["prompt_tokens_after"]
+                })
+                if self.save_history:
+                    await asyncio.to_thread(save_case_history, case["case_description"], analysis)
+                self.stats["completed"] += 1
+                self.stats["cached"] += cached
+            except Exception as error:
+                record["error"] = f"{type(error).__name__}: {error}"
+                self.stats["failed"] += 1
+            record["seconds"] = round(time.perf_counter() - started, 3)
+
+            async with write_lock:
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+            if on_result:
+                on_result(record)
+
+    async def run(self, cases, on_result=None):
+        truncate_partial_line(self.output_path)
+        completed = load_completed_ids(self.output_path)
+        pending = [case for case in cases if case["id"] not in completed]
+        self.stats["skipped"] = len(cases) - len(pending)
+
+        started = time.perf_counter()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        write_lock = asyncio.Lock()
+        with open(self.output_path, "a") as output:
+            await asyncio.gather(
+                self._produce(pending, queue),
+                *(self._work(queue, output, write_lock, on_result) for _ in range(self.concurrency))
+            )
+        elapsed = time.perf_counter() - started
+        self.stats["seconds"] = round(elapsed, 3)
+        self.stats["cases_per_second"] = round(len(pending) / elapsed, 3) if elapsed else 0.0
+        return self.stats
+
+# Python API: analyse every case in `input_path`, appending results to `output_path`
+def run_batch(input_path, output_path, text_column="case_description", id_column="id", **options):
+    prepare_retrieval_backend()
+    cases = read_cases(input_path, text_column, id_column)
+    return asyncio.run(BatchAnalyzer(output_path, **options).run(cases))
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse legal cases in bulk from a CSV or JSONL file.")
+    parser.add_argument("input", help="CSV or .jsonl file of cases")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--text-column", default="case_description")
+    parser.add_argument("--id-column", default="id")
+    parser.add_argument("--concurrency", type=int, default=8, help="max concurrent LLM calls")
+    parser.add_argument("--retrieval-batch-size", type=int, default=64, help="cases per Chroma query")
+    parser.add_argument("--top-n", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--save-history", action="store_true", help="also write each analysis to case history")
+    args = parser.parse_args()
+
+    stats = run_batch(
+        args.input,
+        args.output,
+        text_column=args.text_column,
+        id_column=args.id_column,
+        concurrency=args.concurrency,
+        retrieval_batch_size=args.retrieval_batch_size,
+        top_n=args.top_n,
+        max_retries=args.max_retries,
+        save_history=args.save_history
+    )
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+import chromadb
+from resources import (
+    set_resource,
+    reset_resources,
+    COLLECTION_NAME,
+    RETRIEVAL_MODE,
+    RETRIEVAL_BACKEND,
+    VECTOR_INDEX_DTYPE
+)
+from knowledge_base import create_legal_knowledge_base, knowledge_base_fingerprint, sync_legal_knowledge
+from analysis_cache import AnalysisCache
+from history_store import HistoryStore
+from embeddings import EmbeddingService
+from fake_llm import FakeChatModel
+from retrieval import EVALUATION_QUERIES
+from tracing import MetricsRegistry, percentile
+from vector_index import DTYPES, VectorIndex, export_vector_index
+from legal_advisor import (
+    get_relevant_legal_provisions,
+    retrieve_legal_provisions_batch,
+    analyze_legal_case,
+    analyze_legal_case_stream,
+    save_case_history
+)
+
+# Offline benchmark suite.
+# Runs against a temporary Chroma store and a deterministic FakeChatModel in
+# place of ChatGroq, so no API key or network is needed, and writes the results
+# as JSON for comparing runs over time.
+
+# Cheap deterministic embedding (hashed bag of words) for scaled-up corpora,
+# where running the real embedding model over 100k chunks would dominate the run
+class HashingEmbeddingFunction:
+    def __init__(self, dimensions=384):
+        self.dimensions = dimensions
+
+    def __call__(self, input):
+        embeddings = []
+        for text in input:
+            vector = [0.0] * self.dimensions
+            for word in text.lower().split():
+                digest = hashlib.md5(word.encode("utf-8")).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dimensions
+                vector[index] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            embeddings.append([value / norm for value in vector])
+        return embeddings
+
+# The 36 seed provisions plus deterministic synthetic chunks derived from them
+def synthetic_corpus(size, seed=0):
+    base = create_legal_knowledge_base()
+    if size <= len(base):
+        return base[:size]
+    rng = random.Random(seed)
+    corpus = list(base)
+    for i in range(size - len(base)):
+        item = base[i % len(base)]
+        sentences = item["content"].split(". ")
+        rng.shuffle(sentences)
+        section = rng.randint(1, 600)
+        corpus.append({
+            "provision": f"{item['provision']} - Part {i} (Section {section})",
+            "content": f"Section {section}. " + ". ".join(sentences),
+            "category": item["category"]
+        })
+    return corpus
+
+def summarize(latencies):
+    return {
+        "count": len(latencies),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000
+    }
+
+def use_collection(client, name):
+    collection = client.get_or_create_collection(name=name)
+    set_resource("legal_collection", collection)
+    reset_resources("hybrid_retriever", "vector_index")
+    return collection
+
+# With the numpy backend, serve retrieval from a snapshot of `collection` in the workdir
+def use_vector_index(collection, workdir):
+    if RETRIEVAL_BACKEND != "numpy":
+        return
+    path = os.path.join(workdir, f"index_{collection.name}")
+    export_vector_index(collection, path, VECTOR_INDEX_DTYPE)
+    set_resource("vector_index", VectorIndex(path))
+    reset_resources("hybrid_retriever")
+
+# Resident memory of this process in bytes
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current where /proc is unavailable (kilobytes on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+# Full ingestion of the seed knowledge base, then a no-change resync
+def bench_ingestion(client, embedder):
+    collection = client.get_or_create_collection(name="bench_ingestion")
+    cold = sync_legal_knowledge(collection, create_legal_knowledge_base(), embed=embedder.embed_documents)
+    warm = sync_legal_knowledge(collection, create_legal_knowledge_base(), embed=embedder.embed_documents)
+    client.delete_collection("bench_ingestion")
+    return {"initial": cold, "resync": warm}
+
+def bench_retrieval(client, embedder, sizes, rounds, workdir):
+    queries = [query for query, _ in EVALUATION_QUERIES]
+    results = []
+    for size in sizes:
+        collection = use_collection(client, f"bench_retrieval_{size}")
+        corpus = synthetic_corpus(size)
+        ingestion = sync_legal_knowledge(collection, corpus, embed=embedder.embed_documents)
+        use_vector_index(collection, workdir)
+        get_relevant_legal_provisions("warm up")
+
+        latencies = []
+        for round_index in range(rounds):
+            for query in queries:
+                started = time.perf_counter()
+                # Vary the text each round so the query embedding cache does not hide the search cost
+                get_relevant_legal_provisions(f"{query} ({round_index})")
+                latencies.append(time.perf_counter() - started)
+        results.append({
+            "corpus_size": size,
+            "ingestion_seconds": ingestion["seconds"],
+            "ingestion_docs_per_second": size / ingestion["seconds"] if ingestion["seconds"] else None,
+            "latency": summarize(latencies)
+        })
+        client.delete_collection(f"bench_retrieval_{size}")
+    return results
+
+def bench_analysis(client, embedder, runs, workdir):
+    collection = use_collection(client, "bench_analysis")
+    sync_legal_knowledge(collection, create_legal_knowledge_base(), embed=embedder.embed_documents)
+    use_vector_index(collection, workdir)
+    queries = [query for query, _ in EVALUATION_QUERIES]
+
+    latencies, first_tokens, stream_totals = [], [], []
+    for i in range(runs):
+        query = f"{queries[i % len(queries)]} (run {i})"
+        started = time.perf_counter()
+        analyze_legal_case(query)
+        latencies.append(time.perf_counter() - started)
+
+        metrics = {}
+        for _ in analyze_legal_case_stream(f"{query} streamed", metrics):
+            pass
+        first_tokens.append(metrics["first_token"])
+        stream_totals.append(metrics["total"])
+    return {
+        "invoke": summarize(latencies),
+        "stream_first_token": summarize(first_tokens),
+        "stream_total": summarize(stream_totals)
+    }
+
+# Runs in a fresh process configured through the environment (see bench_backends),
+# so cold start and memory are not skewed by the parent. Times the real
+# get_relevant_legal_provisions path: the first call opens the store and, in
+# hybrid mode, builds the lexical indexes; later calls are warm
+def _probe_backend(queries, top_n, rounds, real_embeddings):
+    set_resource("embedding_service", EmbeddingService(
+        embedding_function=None if real_embeddings else HashingEmbeddingFunction()
+    ).warm_up())
+    set_resource("knowledge_sync", {"skipped": "benchmark"})
+    baseline = rss_bytes()
+    started = time.perf_counter()
+    get_relevant_legal_provisions(queries[0], top_n)
+    cold_start = time.perf_counter() - started
+
+    latencies = []
+    for round_index in range(rounds):
+        for query in queries:
+            started = time.perf_counter()
+            # Vary the text each round so the query embedding cache does not hide the search cost
+            get_relevant_legal_provisions(f"{query} ({round_index})", top_n)
+            latencies.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    for round_index in range(rounds):
+        retrieve_legal_provisions_batch([f"{query} (batch {round_index})" for query in queries], top_n)
+    return {
+        "cold_start_ms": cold_start * 1000,
+        "latency": summarize(latencies),
+        "batch_ms": (time.perf_counter() - started) / rounds * 1000,
+        "rss_mb": (rss_bytes() - baseline) / 1e6
+    }
+
+# Environment variables set for the duration of the block (inherited by spawned processes)
+@contextmanager
+def _environment(**values):
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+# Chroma collection vs the NumPy vector index over the same stored embeddings,
+# through get_relevant_legal_provisions in both vector and hybrid retrieval modes
+def bench_backends(embedder, sizes, rounds, dtype, workdir, real_embeddings=False, top_n=8):
+    queries = [query for query, _ in EVALUATION_QUERIES]
+    query_embeddings = [[float(value) for value in embedding] for embedding in embedder.embed_queries(queries)]
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size in sizes:
+        chroma_path = os.path.join(workdir, f"backend_{size}", "chroma")
+        index_path = os.path.join(workdir, f"backend_{size}", "index")
+        collection = chromadb.PersistentClient(chroma_path).get_or_create_collection(name=COLLECTION_NAME)
+        sync_legal_knowledge(collection, synthetic_corpus(size), embed=embedder.embed_documents)
+        started = time.perf_counter()
+        # Stamped with the seed fingerprint so the probes open it as up to date
+        export_vector_index(
+            collection, index_path, dtype, fingerprint=knowledge_base_fingerprint(create_legal_knowledge_base())
+        )
+        export_seconds = time.perf_counter() - started
+
+        # Share of Chroma's (approximate) top-k that the exact search also returns
+        chroma_ids = collection.query(query_embeddings=query_embeddings, n_results=top_n)["ids"]
+        numpy_ids = [
+            [p["id"] for p in found] for found in VectorIndex(index_path).search_batch(query_embeddings, top_n)
+        ]
+        agreement = statistics.mean(
+            len(set(expected) & set(found)) / len(expected) for expected, found in zip(chroma_ids, numpy_ids) if expected
+        )
+
+        probes = {}
+        for backend in ("chroma", "numpy"):
+            for mode in ("vector", "hybrid"):
+                with _environment(
+                    LEGAL_ADVISOR_BACKEND=backend,
+                    LEGAL_ADVISOR_RETRIEVAL=mode,
+                    LEGAL_ADVISOR_VECTORSTORE=chroma_path,
+                    LEGAL_ADVISOR_VECTOR_INDEX=index_path,
+                    LEGAL_ADVISOR_VECTOR_INDEX_DTYPE=dtype
+                ), context.Pool(1) as pool:
+                    probes[f"{backend}_{mode}"] = pool.apply(_probe_backend, (queries, top_n, rounds, real_embeddings))
+        results.append({
+            "corpus_size": size,
+            "dtype": dtype,
+            "export_seconds": export_seconds,
+            "top_k_agreement": agreement,
+            "disk_mb": {"chroma": directory_bytes(chroma_path) / 1e6, "numpy": directory_bytes(index_path) / 1e6},
+            **probes
+        })
+    return results
+
+def bench_history(writes):
+    analysis = "## Case Summary\n" + "analysis text " * 300
+    started = time.perf_counter()
+    for i in range(writes):
+        save_case_history(f"Benchmark case {i}", analysis)
+    elapsed = time.perf_counter() - started
+    return {"writes": writes, "seconds": elapsed, "writes_per_second": writes / elapsed}
+
+def run_benchmarks(
+    sizes=(36, 1000, 10000, 100000),
+    rounds=3,
+    analysis_runs=20,
+    history_writes=500,
+    first_token_latency=0.3,
+    token_latency=0.0,
+    output_tokens=400,
+    real_embeddings=False,
+    index_dtype=VECTOR_INDEX_DTYPE
+):
+    workdir = tempfile.mkdtemp(prefix="legal-advisor-bench-")
+    try:
+        client = chromadb.PersistentClient(os.path.join(workdir, "vectorstore"))
+        embedding_function = None if real_embeddings else HashingEmbeddingFunction()
+        embedder = EmbeddingService(embedding_function=embedding_function).warm_up()
+        llm = FakeChatModel(
+            first_token_latency=first_token_latency,
+            token_latency=token_latency,
+            output_tokens=output_tokens
+        )
+        set_resource("chroma_client", client)
+        set_resource("embedding_service", embedder)
+        set_resource("llm", llm)
+        set_resource("knowledge_sync", {"skipped": "benchmark"})
+        set_resource("analysis_cache", AnalysisCache(os.path.join(workdir, "cache.sqlite3"), "benchmark"))
+        set_resource("history_store", HistoryStore(os.path.join(workdir, "history.sqlite3")))
+        # Traces of fake-LLM runs stay in memory instead of the real metrics files
+        set_resource("metrics_registry", MetricsRegistry())
+        reset_resources("analysis_chain", "legal_collection", "hybrid_retriever", "vector_index")
+
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "environment": {"python": platform.python_version(), "platform": platform.platform()},
+            "config": {
+                "retrieval_mode": RETRIEVAL_MODE,
+                "retrieval_backend": RETRIEVAL_BACKEND,
+                "embeddings": "default" if real_embeddings else "hashing",
+                "fake_llm": {
+                    "first_token_latency": first_token_latency,
+                    "token_latency": token_latency,
+                    "output_tokens": output_tokens
+                }
+            },
+            "ingestion": bench_ingestion(client, embedder),
+            "retrieval": bench_retrieval(client, embedder, sizes, rounds, workdir),
+            "backends": bench_backends(embedder, sizes, rounds, index_dtype, workdir, real_embeddings),
+            "analysis": bench_analysis(client, embedder, analysis_runs, workdir),
+            "history": bench_history(history_writes)
+        }
+    finally:
+        reset_resources()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the legal advisor offline with a stand-in LLM.")
+    parser.add_argument("-o", "--output", default=None, help="JSON file to write (default: benchmarks/<timestamp>.json)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[36, 1000, 10000, 100000], help="corpus sizes for retrieval")
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the query set per corpus size")
+    parser.add_argument("--analysis-runs", type=int, default=20)
+    parser.add_argument("--history-writes", type=int, default=500)
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="fake LLM seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="fake LLM seconds per output token")
+    parser.add_argument("--output-tokens", type=int, default=400, help="fake LLM output length")
+    parser.add_argument("--real-embeddings", action="store_true", help="use the real embedding model instead of hashing")
+    parser.add_argument("--index-dtype", choices=DTYPES, default=VECTOR_INDEX_DTYPE, help="NumPy index storage type")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        sizes=args.sizes,
+        rounds=args.rounds,
+        analysis_runs=args.analysis_runs,
+        history_writes=args.history_writes,
+        first_token_latency=args.first_token_latency,
+        token_latency=args.token_latency,
+        output_tokens=args.output_tokens,
+        real_embeddings=args.real_embeddings,
+        index_dtype=args.index_dtype
+    )
+    output = args.output or os.path.join("benchmarks", time.strftime("%Y%m%d_%H%M%S") + ".json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import re
+
+# Context packing for the analysis prompt.
+# Retrieved provisions are filtered by relevance (the vector distances returned
+# by the query), de-duplicated, and packed into a token budget, truncating long
+# contents at sentence boundaries, or at a word boundary when even the first
+# sentence is too long (statute sections often are one sentence). Token counts
+# are estimates (about four characters per token), which is close enough to
+# compare prompt sizes.
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def estimate_tokens(text):
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+def format_provision(provision):
+    return f"{provision['provision']}: {provision['content']}"
+
+# Longest prefix of `text` ending at a word boundary, with an ellipsis, that fits in `max_tokens`
+def truncate_to_words(text, max_tokens):
+    limit = max_tokens * 4 - 1
+    if limit <= 0:
+        return ""
+    cut = text[:limit]
+    if len(text) > limit and not text[limit].isspace() and " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:") + "…"
+
+# Longest prefix of `text` made of whole sentences that fits in `max_tokens`,
+# falling back to a word-boundary cut when not even the first sentence fits
+def truncate_to_sentences(text, max_tokens):
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept = ""
+    for sentence in SENTENCE_END.split(text):
+        candidate = f"{kept} {sentence}" if kept else sentence
+        if estimate_tokens(candidate) > max_tokens:
+            break
+        kept = candidate
+    return kept or truncate_to_words(text, max_tokens)
+
+def _word_set(text):
+    return set(WORD_PATTERN.findall(text.lower()))
+
+def _is_relevant(provision, best_distance, max_distance, distance_margin):
+    distance = provision.get("distance")
+    if distance is None:
+        # Only surfaced by lexical search; keep it when it matched a cited section/article
+        return provision.get("reference_match", False)
+    if max_distance is not None and distance > max_distance:
+        return False
+    return best_distance is None or distance <= best_distance + distance_margin
+
+def pack_provisions(
+    provisions,
+    token_budget=1200,
+    max_distance=1.4,
+    distance_margin=0.4,
+    min_provisions=2,
+    redundancy_threshold=0.8,
+    max_provision_tokens=300,
+    min_fragment_tokens=40
+):
+    distances = [p["distance"] for p in provisions if p.get("distance") is not None]
+    best_distance = min(distances) if distances else None
+    stats = {"irrelevant": 0, "redundant": 0, "over_budget": 0, "truncated": 0}
+
+    packed, kept_words, used = [], [], 0
+    for rank, provision in enumerate(provisions):
+        if rank >= min_provisions and not _is_relevant(provision, best_distance, max_distance, distance_margin):
+            stats["irrelevant"] += 1
+            continue
+
+        words = _word_set(provision["content"])
+        if any(len(words & other) / max(1, len(words | other)) >= redundancy_threshold for other in kept_words):
+            stats["redundant"] += 1
+            continue
+
+        remaining = token_budget - used
+        header_tokens = estimate_tokens(provision["provision"]) + 1
+        content_budget = min(max_provision_tokens, remaining - header_tokens)
+        if not packed:
+            # The best match always gets in, if only as a fragment
+            content_budget = max(content_budget, min_fragment_tokens)
+        if content_budget < min_fragment_tokens:
+            stats["over_budget"] += 1
+            continue
+        content = truncate_to_sentences(provision["content"], content_budget)
+        if not content:
+            stats["over_budget"] += 1
+            continue
+        if content != provision["content"]:
+            stats["truncated"] += 1
+            provision = dict(provision, content=content)
+
+        packed.append(provision)
+        kept_words.append(words)
+        used += estimate_tokens(format_provision(provision))
+
+    return packed, stats
+
+def prompt_tokens(template, case_description, provisions):
+    legal_provisions = "\n\n".join(format_provision(p) for p in provisions)
+    return estimate_tokens(template.format(case_description=case_description, legal_provisions=legal_provisions))
@@ -0,0 +1,95 @@
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from chromadb.utils import embedding_functions
+
+# Explicit embedding layer for the indian_legal_knowledge collection.
+# Wraps the same default model Chroma uses for the collection, loads and warms
+# it up front, embeds documents in batches, and memoizes query embeddings in a
+# bounded LRU so repeated descriptions (e.g. retries) skip the model entirely.
+
+def normalize_query(text):
+    return " ".join(text.split()).lower()
+
+class EmbeddingService:
+    def __init__(self, embedding_function=None, cache_size=2048, batch_size=64):
+        self.embedding_function = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.stats = {"hits": 0, "misses": 0}
+        self.timings = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Loads the model and runs it once so the first real query is not the slow one
+    def warm_up(self):
+        started = time.perf_counter()
+        self.embedding_function(["warm up"])
+        self.timings["cold_embed"] = time.perf_counter() - started
+        started = time.perf_counter()
+        self.embedding_function(["warm up again"])
+        self.timings["warm_embed"] = time.perf_counter() - started
+        return self
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            embeddings.extend(self.embedding_function(texts[start:start + self.batch_size]))
+        return embeddings
+
+    def embed_queries(self, texts):
+        keys = [normalize_query(text) for text in texts]
+        results = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[key] = self._cache[key]
+            missing = list(dict.fromkeys(key for key in keys if key not in results))
+            self.stats["hits"] += len(keys) - len(missing)
+            self.stats["misses"] += len(missing)
+
+        if missing:
+            computed = self.embed_documents(missing)
+            with self._lock:
+                for key, embedding in zip(missing, computed):
+                    results[key] = embedding
+                    self._cache[key] = embedding
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [results[key] for key in keys]
+
+    def embed_query(self, text):
+        return self.embed_queries([text])[0]
+
+# Cold-start, warm and cached latency of a single query embedding
+def measure_query_latency(service, query="Police refused to register my FIR", repeats=5):
+    report = {}
+    started = time.perf_counter()
+    service.embed_query(query)
+    report["cold_ms"] = (time.perf_counter() - started) * 1000
+
+    warm = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        service.embed_query(f"{query} variant {i}")
+        warm.append(time.perf_counter() - started)
+    report["warm_ms"] = sum(warm) / len(warm) * 1000
+
+    started = time.perf_counter()
+    service.embed_query(query)
+    report["cached_ms"] = (time.perf_counter() - started) * 1000
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold-start versus warm query embedding latency.")
+    parser.add_argument("--query", default="Police refused to register my FIR")
+    args = parser.parse_args()
+    print(json.dumps(measure_query_latency(EmbeddingService(), args.query), indent=2))
+
+if __name__ == "__main__":
+    main()
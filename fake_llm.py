@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from aiohttp import web
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Deterministic stand-ins for ChatGroq, used to measure and test the app without
+# an API key: FakeChatModel replaces the LangChain model in-process, and the mock
+# server below speaks Groq's OpenAI-compatible HTTP API. The reply depends only on
+# the prompt, and the time to first token and per-token delay are configurable so
+# runs approximate a real provider.
+
+WORDS = [
+    "court", "section", "police", "complaint", "evidence", "remedy", "appeal", "rights",
+    "procedure", "file", "notice", "hearing", "relief", "order", "petition", "legal"
+]
+
+def fake_completion_tokens(prompt, output_tokens):
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    return ["## Case Summary\n"] + [rng.choice(WORDS) + " " for _ in range(output_tokens - 1)]
+
+class FakeChatModel(BaseChatModel):
+    first_token_latency: float = 0.3
+    token_latency: float = 0.0
+    output_tokens: int = 400
+
+    @property
+    def _llm_type(self):
+        return "fake-legal-advisor"
+
+    def _tokens(self, messages):
+        prompt = "\n".join(str(message.content) for message in messages)
+        return fake_completion_tokens(prompt, self.output_tokens)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        time.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_latency)
+        for token in self._tokens(messages):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_latency)
+        for token in self._tokens(messages):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+# Mock of POST /openai/v1/chat/completions; point the client at it with GROQ_BASE_URL
+def create_mock_llm_app(first_token_latency=0.3, token_latency=0.0, output_tokens=400):
+    app = web.Application()
+    app["stats"] = {"requests": 0}
+
+    async def chat_completions(request):
+        app["stats"]["requests"] += 1
+        body = await request.json()
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        tokens = fake_completion_tokens(prompt, output_tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "mock")
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(tokens),
+            "total_tokens": len(prompt) // 4 + len(tokens)
+        }
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_latency + token_latency * len(tokens))
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(first_token_latency)
+        for index, token in enumerate(tokens):
+            if token_latency:
+                await asyncio.sleep(token_latency)
+            last = index == len(tokens) - 1
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": "stop" if last else None}]
+            }
+            if last:
+                chunk["x_groq"] = {"usage": usage}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def stats(request):
+        return web.json_response(app["stats"])
+
+    app.router.add_post("/openai/v1/chat/completions", chat_completions)
+    app.router.add_get("/stats", stats)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock Groq chat-completions endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=400)
+    args = parser.parse_args()
+    web.run_app(
+        create_mock_llm_app(args.first_token_latency, args.token_latency, args.output_tokens),
+        host=args.host,
+        port=args.port
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import datetime
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Append-only case history in SQLite.
+# Every analysis gets a random collision-free ID, and the table is indexed by
+# time (plus a full-text index when SQLite has FTS5), so the sidebar and
+# tools can page through history without opening every record.
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def _to_epoch(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time.min)
+    return value.timestamp()
+
+class HistoryStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cases (
+                    id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    session_id TEXT,
+                    case_description TEXT NOT NULL,
+                    analysis TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cases_created_at ON cases (created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cases_session ON cases (session_id, created_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.has_fts = self._create_fts()
+
+    def _create_fts(self):
+        try:
+            with self._conn:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5("
+                    "case_description, analysis, content='cases', content_rowid='rowid')"
+                )
+                self._conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS cases_fts_insert AFTER INSERT ON cases BEGIN "
+                    "INSERT INTO cases_fts (rowid, case_description, analysis) "
+                    "VALUES (new.rowid, new.case_description, new.analysis); END"
+                )
+            return True
+        except sqlite3.OperationalError:
+            return False  # SQLite built without FTS5, fall back to LIKE
+
+    def add(self, case_description, analysis, session_id=None, created_at=None):
+        case_id = uuid.uuid4().hex
+        created_at = time.time() if created_at is None else created_at
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO cases (id, created_at, session_id, case_description, analysis) VALUES (?, ?, ?, ?, ?)",
+                (case_id, created_at, session_id, case_description, analysis)
+            )
+        return case_id
+
+    def _where(self, start, end, keyword, session_id):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("cases.created_at >= ?")
+            params.append(_to_epoch(start))
+        if end is not None:
+            clauses.append("cases.created_at < ?")
+            params.append(_to_epoch(end))
+        if session_id is not None:
+            clauses.append("cases.session_id = ?")
+            params.append(session_id)
+        if keyword:
+            if self.has_fts:
+                clauses.append("cases.rowid IN (SELECT rowid FROM cases_fts WHERE cases_fts MATCH ?)")
+                params.append(" ".join('"' + term.replace('"', '""') + '"' for term in keyword.split()))
+            else:
+                for term in keyword.split():
+                    clauses.append("(cases.case_description LIKE ? OR cases.analysis LIKE ?)")
+                    params.extend([f"%{term}%", f"%{term}%"])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    # One page of cases, newest first; analyses are loaded separately with get()
+    def query(self, start=None, end=None, keyword=None, session_id=None, limit=20, offset=0):
+        where, params = self._where(start, end, keyword, session_id)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, created_at, session_id, case_description FROM cases{where} "
+                "ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def count(self, start=None, end=None, keyword=None, session_id=None):
+        where, params = self._where(start, end, keyword, session_id)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM cases{where}", params).fetchone()[0]
+
+    def get(self, case_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM cases WHERE id = ?", (case_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    @staticmethod
+    def _row_to_dict(row):
+        record = dict(row)
+        record["timestamp"] = time.strftime(TIMESTAMP_FORMAT, time.localtime(record["created_at"]))
+        return record
+
+    # One-time import of the legacy case_history/*.json files
+    def migrate_json_dir(self, directory="case_history"):
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if done or not os.path.isdir(directory):
+            return 0
+
+        rows = []
+        for filename in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            try:
+                with open(filename) as f:
+                    case_data = json.load(f)
+                created_at = time.mktime(time.strptime(case_data["timestamp"], TIMESTAMP_FORMAT))
+            except (OSError, ValueError, KeyError):
+                continue
+            rows.append((
+                uuid.uuid4().hex,
+                created_at,
+                None,
+                case_data.get("case_description", ""),
+                case_data.get("analysis", "")
+            ))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO cases (id, created_at, session_id, case_description, analysis) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(len(rows)),))
+        return len(rows)
@@ -0,0 +1,342 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from resources import VECTOR_INDEX_PATH, get_legal_collection, get_analysis_cache, rebuild_vector_index
+
+# Ingestion pipeline for full bare-act texts.
+# Statute files are streamed from a directory and split into section-aware
+# chunks, embeddings are computed in a process pool, and chunks are upserted
+# into indian_legal_knowledge in large batches. Only a bounded number of
+# embedding batches are in flight at once, so memory stays flat however large
+# the corpus is. A checkpoint records files that are fully written, so an
+# interrupted run resumes where it stopped.
+#
+# Supported inputs:
+# - .txt / .md: plain or PDF-extracted text. The first line is taken as the act
+#   name; sections start on lines like "154. Information in cognizable cases.—"
+#   or "Section 154. ..." / "Article 32. ...".
+# - .jsonl: one section per line with "act", "section", "title", "text" and an
+#   optional "category".
+
+SECTION_HEADING = re.compile(
+    r"^\s*(?:(?:section|sec\.|article|art\.|rule|order)\s+)?(\d{1,4}[A-Z]{0,3})\.\s+(\S.{1,200}?)(?:\.?\s*[—–]+|\.\s*-+|\.?\s*$)",
+    re.IGNORECASE
+)
+# Amendment footnotes printed at the foot of bare-act pages, such as
+# "1. Subs. by Act 5 of 2009, s. 8." or "2. Ins. by Act 13 of 2013, s. 13 (w.e.f. 3-2-2013)."
+# They look like section headings, so they are skipped unless the title is
+# followed by a heading delimiter (".—" or ".-"), which footnotes never have:
+# "2. Repeal and savings.—(1) ... as amended by Act 45 of 1860" is a heading.
+FOOTNOTE = re.compile(
+    r"^\s*\d{1,3}\.\s+(?:"
+    r"(?:subs|ins|rep|omitted|added|renumbered|cl|the\s+words?|now\s+see|vide|see)\b"
+    r"|.*\bby\s+(?:the\s+)?(?:act|ord(?:inance)?\.?|regulation)\s+(?:no\.\s*)?\d+\s+of\s+\d{4}"
+    r"|.*\bw\.\s*e\.\s*f\."
+    r")",
+    re.IGNORECASE
+)
+HEADING_DELIMITER = re.compile(r"\.?\s*[—–]+|\.\s*-+")
+SENTENCE_END = re.compile(r"(?<=[.;:])\s+")
+
+# Category assigned from keywords in the act name, in the same vocabulary as the seed knowledge base
+CATEGORY_KEYWORDS = [
+    ("criminal procedure", "criminal_procedure"),
+    ("nagarik suraksha", "criminal_procedure"),
+    ("penal code", "criminal_law"),
+    ("nyaya sanhita", "criminal_law"),
+    ("civil procedure", "civil_procedure"),
+    ("limitation", "civil_procedure"),
+    ("evidence", "evidence_law"),
+    ("sakshya", "evidence_law"),
+    ("constitution", "constitutional_rights"),
+    ("contract", "contract_law"),
+    ("sale of goods", "commercial_law"),
+    ("companies", "corporate_law"),
+    ("property", "property_law"),
+    ("registration", "property_law"),
+    ("marriage", "family_law"),
+    ("succession", "family_law"),
+    ("consumer", "consumer_law"),
+    ("information technology", "cyber_law"),
+]
+DEFAULT_CATEGORY = "statute"
+
+def category_for_act(act):
+    lowered = act.lower()
+    for keyword, category in CATEGORY_KEYWORDS:
+        if keyword in lowered:
+            return category
+    return DEFAULT_CATEGORY
+
+def act_name_from_path(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"[_-]+", " ", stem).strip().title()
+
+# Split long section text at paragraph, then sentence boundaries
+def split_text(text, max_chars):
+    if len(text) <= max_chars:
+        return [text]
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        pieces.extend(SENTENCE_END.split(paragraph) if len(paragraph) > max_chars else [paragraph])
+
+    chunks, current = [], ""
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        if current and len(current) + len(piece) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        while len(piece) > max_chars:
+            chunks.append(piece[:max_chars])
+            piece = piece[max_chars:]
+        current = f"{current} {piece}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+def iter_text_sections(path):
+    act = None
+    number, title, lines = None, None, []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.replace("\f", "\n").rstrip()
+            heading = SECTION_HEADING.match(line)
+            delimited = heading and HEADING_DELIMITER.match(line, heading.end(2))
+            if not delimited and FOOTNOTE.match(line):
+                continue
+            if act is None and line.strip():
+                # The first line names the act unless the file starts straight with a section
+                act = act_name_from_path(path) if heading else line.strip()
+                if not heading:
+                    continue
+            if heading:
+                if lines:
+                    yield act, number, title, "\n".join(lines).strip()
+                number, title = heading.group(1), heading.group(2).strip().rstrip(".")
+                lines = [line.strip()]
+            else:
+                lines.append(line)
+    if lines and "\n".join(lines).strip():
+        yield act, number, title, "\n".join(lines).strip()
+
+def iter_jsonl_sections(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            act = record.get("act") or act_name_from_path(path)
+            text = record.get("text") or record.get("content") or ""
+            yield act, record.get("section"), record.get("title"), text, record.get("category")
+
+# Section-aware chunks with provision/category/section metadata for one file
+def iter_file_chunks(path, root, max_chars=2000):
+    if path.endswith(".jsonl"):
+        sections = iter_jsonl_sections(path)
+    else:
+        sections = (section + (None,) for section in iter_text_sections(path))
+    source = os.path.relpath(path, root)
+    # A section number can recur in one file (schedules, misparsed lines), so
+    # IDs also carry how many times the number has been seen
+    occurrences = Counter()
+
+    for act, number, title, text, category in sections:
+        if not text.strip():
+            continue
+        occurrence = occurrences[number]
+        occurrences[number] += 1
+        category = category or category_for_act(act)
+        parts = split_text(text, max_chars)
+        for part, content in enumerate(parts, start=1):
+            label = f"Section {number}" if number else "Preamble"
+            provision = f"{act} - {title} ({label})" if title else f"{act} ({label})"
+            if len(parts) > 1:
+                provision += f" [part {part}/{len(parts)}]"
+            key = "\x1f".join([source, str(number), str(occurrence), str(part)])
+            yield {
+                "id": "chunk-" + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32],
+                "document": content,
+                "metadata": {
+                    "provision": provision,
+                    "category": category,
+                    "act": act,
+                    "section": str(number or ""),
+                    "source": source,
+                    "content_hash": hashlib.sha256(content.encode("utf-8")).hexdigest()
+                }
+            }
+
+def iter_statute_files(directory):
+    for pattern in ("**/*.txt", "**/*.md", "**/*.jsonl"):
+        yield from sorted(glob.glob(os.path.join(directory, pattern), recursive=True))
+
+# Embedding model loaded once per worker process
+_worker_embedding_function = None
+
+def _init_worker():
+    global _worker_embedding_function
+    from chromadb.utils import embedding_functions
+    _worker_embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+def _embed_batch(documents):
+    return [list(map(float, embedding)) for embedding in _worker_embedding_function(documents)]
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"completed_files": []}
+
+def save_checkpoint(path, checkpoint):
+    if not path:
+        return
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(temporary, path)
+
+class IngestionPipeline:
+    def __init__(
+        self,
+        collection,
+        checkpoint_path=None,
+        workers=None,
+        embed_batch_size=256,
+        write_batch_size=4000,
+        max_chunk_chars=2000,
+        progress=None
+    ):
+        self.collection = collection
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers or os.cpu_count() or 1
+        self.embed_batch_size = embed_batch_size
+        self.write_batch_size = write_batch_size
+        self.max_chunk_chars = max_chunk_chars
+        self.progress = progress
+        self.stats = {"files": 0, "files_skipped": 0, "chunks": 0, "writes": 0}
+
+    def run(self, directory):
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        completed = set(checkpoint["completed_files"])
+        # Chunks of each file still waiting to be written, and files fully read
+        outstanding, fully_read = {}, set()
+        # Embedding futures in flight, mapped to the chunks they embed
+        buffer, pending = [], {}
+        started = time.perf_counter()
+
+        def flush():
+            if not buffer:
+                return
+            self.collection.upsert(
+                ids=[chunk["id"] for chunk, _ in buffer],
+                documents=[chunk["document"] for chunk, _ in buffer],
+                metadatas=[chunk["metadata"] for chunk, _ in buffer],
+                embeddings=[embedding for _, embedding in buffer]
+            )
+            for chunk, _ in buffer:
+                outstanding[chunk["metadata"]["source"]] -= 1
+            self.stats["chunks"] += len(buffer)
+            self.stats["writes"] += 1
+            buffer.clear()
+            for source in [s for s in fully_read if outstanding[s] == 0]:
+                fully_read.discard(source)
+                completed.add(source)
+            checkpoint["completed_files"] = sorted(completed)
+            save_checkpoint(self.checkpoint_path, checkpoint)
+            if self.progress:
+                self.progress(self._report(started))
+
+        def collect(done):
+            for future in done:
+                chunks = pending.pop(future)
+                buffer.extend(zip(chunks, future.result()))
+            if len(buffer) >= self.write_batch_size:
+                flush()
+
+        def submit(executor, batch):
+            # Bound the work in flight: wait for a batch to finish before queueing more
+            while len(pending) >= self.workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = executor.submit(_embed_batch, [chunk["document"] for chunk in batch])
+            pending[future] = batch
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            batch = []
+            for path in iter_statute_files(directory):
+                source = os.path.relpath(path, directory)
+                if source in completed:
+                    self.stats["files_skipped"] += 1
+                    continue
+                outstanding[source] = 0
+                for chunk in iter_file_chunks(path, directory, self.max_chunk_chars):
+                    outstanding[source] += 1
+                    batch.append(chunk)
+                    if len(batch) >= self.embed_batch_size:
+                        submit(executor, batch)
+                        batch = []
+                fully_read.add(source)
+                self.stats["files"] += 1
+            if batch:
+                submit(executor, batch)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            flush()
+
+        # Files with no chunks never pass through flush()
+        for source in [s for s in fully_read if outstanding[s] == 0]:
+            completed.add(source)
+        checkpoint["completed_files"] = sorted(completed)
+        save_checkpoint(self.checkpoint_path, checkpoint)
+        return self._report(started)
+
+    def _report(self, started):
+        elapsed = time.perf_counter() - started
+        return dict(
+            self.stats,
+            seconds=round(elapsed, 3),
+            documents_per_second=round(self.stats["chunks"] / elapsed, 1) if elapsed else 0.0
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest full statute texts into the legal knowledge base.")
+    parser.add_argument("directory", help="directory of .txt/.md/.jsonl statute files")
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.json", help="resume state file")
+    parser.add_argument("--workers", type=int, default=None, help="embedding processes (default: CPU count)")
+    parser.add_argument("--embed-batch-size", type=int, default=256)
+    parser.add_argument("--write-batch-size", type=int, default=4000)
+    parser.add_argument("--max-chunk-chars", type=int, default=2000)
+    args = parser.parse_args()
+
+    pipeline = IngestionPipeline(
+        get_legal_collection(),
+        checkpoint_path=args.checkpoint,
+        workers=args.workers,
+        embed_batch_size=args.embed_batch_size,
+        write_batch_size=args.write_batch_size,
+        max_chunk_chars=args.max_chunk_chars,
+        progress=lambda report: print(
+            f"{report['chunks']} chunks from {report['files']} files, {report['documents_per_second']} docs/s",
+            flush=True
+        )
+    )
+    report = pipeline.run(args.directory)
+    if report["chunks"]:
+        # Cached analyses were produced against the old corpus
+        get_analysis_cache().clear()
+        # Refresh the in-memory index snapshot so it includes the new chunks
+        if os.path.exists(VECTOR_INDEX_PATH):
+            rebuild_vector_index()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
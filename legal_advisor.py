@@ -0,0 +1,141 @@
+import time
+from resources import (
+    RETRIEVAL_MODE,
+    RETRIEVAL_BACKEND,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_MAX_DISTANCE,
+    legal_analysis_template,
+    get_legal_collection,
+    get_hybrid_retriever,
+    get_vector_index,
+    get_embedding_service,
+    get_llm,
+    get_legal_analysis_prompt,
+    get_analysis_cache,
+    get_history_store,
+    get_metrics_registry
+)
+from retrieval import vector_search_batch
+from context_packing import estimate_tokens, format_provision, pack_provisions, prompt_tokens
+from tracing import trace_request, span, annotate
+
+# Retrieval and analysis pipeline shared by the Streamlit app and headless tools
+
+# Query relevant legal provisions, optionally restricted to some categories
+def retrieve_legal_provisions(case_description, top_n=8, categories=None):
+    return retrieve_legal_provisions_batch([case_description], top_n, categories)[0]
+
+# Retrieve provisions for many cases; the vector search runs as a single query call
+def retrieve_legal_provisions_batch(case_descriptions, top_n=8, categories=None, mode=None):
+    with span("retrieval"):
+        if (mode or RETRIEVAL_MODE) == "hybrid":
+            return get_hybrid_retriever().retrieve_batch(case_descriptions, top_n, categories)
+        if RETRIEVAL_BACKEND == "numpy":
+            query_embeddings = get_embedding_service().embed_queries(case_descriptions)
+            return get_vector_index().search_batch(query_embeddings, top_n, categories)
+        return vector_search_batch(get_legal_collection(), case_descriptions, top_n, categories, get_embedding_service())
+
+def format_legal_provisions(provisions):
+    return "\n\n".join(format_provision(p) for p in provisions)
+
+def get_relevant_legal_provisions(case_description, top_n=8, categories=None):
+    return format_legal_provisions(retrieve_legal_provisions(case_description, top_n, categories))
+
+# Pack retrieved provisions into the context budget and build the chain inputs.
+# Prompt token counts before and after packing are recorded in `metrics`.
+def prepare_analysis_inputs(case_description, provisions, metrics=None):
+    with span("context_packing"):
+        packed, packing_stats = pack_provisions(
+            provisions,
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            max_distance=CONTEXT_MAX_DISTANCE
+        )
+    annotate(provisions_retrieved=len(provisions), provisions_packed=len(packed))
+    if metrics is not None:
+        metrics["provisions_retrieved"] = len(provisions)
+        metrics["provisions_packed"] = len(packed)
+        metrics["packing"] = packing_stats
+        metrics["prompt_tokens_before"] = prompt_tokens(legal_analysis_template, case_description, provisions)
+        metrics["prompt_tokens_after"] = prompt_tokens(legal_analysis_template, case_description, packed)
+    inputs = {
+        "case_description": case_description,
+        "legal_provisions": format_legal_provisions(packed)
+    }
+    return inputs, [p["id"] for p in packed]
+
+# Token usage reported by the provider, falling back to estimates
+def record_token_usage(usage, prompt_text, completion_text):
+    usage = usage or {}
+    annotate(
+        prompt_tokens=usage.get("input_tokens") or estimate_tokens(prompt_text),
+        completion_tokens=usage.get("output_tokens") or estimate_tokens(completion_text)
+    )
+
+def _cached_analysis(case_description, provision_ids):
+    with span("cache_lookup"):
+        cached = get_analysis_cache().get(case_description, provision_ids)
+    annotate(cached=cached is not None)
+    return cached
+
+# Analyze case using prompt + LLM, reusing a cached analysis when one exists
+def analyze_legal_case(case_description, metrics=None):
+    with trace_request(get_metrics_registry(), "analysis"):
+        provisions = retrieve_legal_provisions(case_description)
+        inputs, provision_ids = prepare_analysis_inputs(case_description, provisions, metrics)
+        cached = _cached_analysis(case_description, provision_ids)
+        if cached is not None:
+            return cached
+
+        with span("prompt_format"):
+            prompt = get_legal_analysis_prompt().format_prompt(**inputs)
+        with span("llm"):
+            response = get_llm().invoke(prompt)
+        record_token_usage(response.usage_metadata, prompt.to_string(), response.content)
+        get_analysis_cache().put(case_description, provision_ids, response.content)
+        return response.content
+
+# Stream the analysis chunk by chunk, recording time-to-first-token, total latency
+# and prompt token counts in `metrics`
+def analyze_legal_case_stream(case_description, metrics=None):
+    metrics = {} if metrics is None else metrics
+    with trace_request(get_metrics_registry(), "analysis"):
+        started = time.perf_counter()
+        provisions = retrieve_legal_provisions(case_description)
+        inputs, provision_ids = prepare_analysis_inputs(case_description, provisions, metrics)
+        cached = _cached_analysis(case_description, provision_ids)
+        if cached is not None:
+            metrics["cached"] = True
+            metrics["first_token"] = metrics["total"] = time.perf_counter() - started
+            yield cached
+            return
+
+        metrics["cached"] = False
+        with span("prompt_format"):
+            prompt = get_legal_analysis_prompt().format_prompt(**inputs)
+        chunks = []
+        usage = None
+        stream = iter(get_llm().stream(prompt))
+        while True:
+            # Only time spent waiting on the provider counts towards the llm stage
+            with span("llm"):
+                chunk = next(stream, None)
+            if chunk is None:
+                break
+            usage = chunk.usage_metadata or usage
+            if not chunk.content:
+                continue
+            if not chunks:
+                metrics["first_token"] = time.perf_counter() - started
+                annotate(first_token_ms=round(metrics["first_token"] * 1000, 3))
+            chunks.append(chunk.content)
+            yield chunk.content
+
+        analysis = "".join(chunks)
+        record_token_usage(usage, prompt.to_string(), analysis)
+        get_analysis_cache().put(case_description, provision_ids, analysis)
+        metrics["total"] = time.perf_counter() - started
+
+# Save case history to the indexed history store, returns the new case ID
+def save_case_history(case_description, analysis, session_id=None):
+    with span("history_write"):
+        return get_history_store().add(case_description, analysis, session_id=session_id)
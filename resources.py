@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+import chromadb
+from langchain_groq import ChatGroq
+from langchain_core.prompts import PromptTemplate
+from knowledge_base import create_legal_knowledge_base, knowledge_base_fingerprint, sync_legal_knowledge
+from analysis_cache import AnalysisCache, fingerprint
+from history_store import HistoryStore
+from retrieval import HybridRetriever
+from embeddings import EmbeddingService
+from vector_index import VectorIndex, export_vector_index, load_vector_index
+from tracing import MetricsRegistry, start_metrics_server
+
+# Process-wide resources shared by every Streamlit session and rerun.
+# Streamlit re-executes app.py on each interaction, but imported modules are
+# only loaded once per process, so everything below is built lazily on first
+# use and then reused.
+
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
+# Override the provider URL, e.g. to point at the mock server in fake_llm.py
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL")
+MODEL_NAME = os.environ.get("LEGAL_ADVISOR_MODEL", "llama-3.1-8b-instant")
+VECTORSTORE_PATH = os.environ.get("LEGAL_ADVISOR_VECTORSTORE", "legal_vectorstore")
+COLLECTION_NAME = "indian_legal_knowledge"
+# "hybrid" (vector + BM25 + exact statute references) or "vector"
+RETRIEVAL_MODE = os.environ.get("LEGAL_ADVISOR_RETRIEVAL", "hybrid")
+# Where dense search runs: "chroma" (the persistent collection) or "numpy"
+# (a memory-mapped snapshot of it, see vector_index.py)
+RETRIEVAL_BACKEND = os.environ.get("LEGAL_ADVISOR_BACKEND", "chroma")
+VECTOR_INDEX_PATH = os.environ.get("LEGAL_ADVISOR_VECTOR_INDEX", "legal_vector_index")
+# "float16", "int8" or "float32"
+VECTOR_INDEX_DTYPE = os.environ.get("LEGAL_ADVISOR_VECTOR_INDEX_DTYPE", "float16")
+# Number of query embeddings kept in memory
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("LEGAL_ADVISOR_EMBEDDING_CACHE", "2048"))
+# Estimated tokens of provision text allowed in the analysis prompt
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("LEGAL_ADVISOR_CONTEXT_TOKENS", "1200"))
+# Vector distance past which a retrieved provision is considered irrelevant
+CONTEXT_MAX_DISTANCE = float(os.environ.get("LEGAL_ADVISOR_MAX_DISTANCE", "1.4"))
+
+ANALYSIS_CACHE_PATH = os.environ.get("LEGAL_ADVISOR_CACHE", "analysis_cache.sqlite3")
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get("LEGAL_ADVISOR_CACHE_MAX_ENTRIES", "5000"))
+ANALYSIS_CACHE_TTL_SECONDS = int(os.environ.get("LEGAL_ADVISOR_CACHE_TTL", str(7 * 24 * 3600)))
+# Set to e.g. 0.85 to let paraphrased descriptions reuse a cached analysis
+ANALYSIS_CACHE_SIMILARITY = os.environ.get("LEGAL_ADVISOR_CACHE_SIMILARITY")
+
+HISTORY_STORE_PATH = os.environ.get("LEGAL_ADVISOR_HISTORY", "case_history.sqlite3")
+LEGACY_HISTORY_DIR = "case_history"
+
+# One JSON line per traced request, and the latest Prometheus text snapshot
+METRICS_LOG_PATH = os.environ.get("LEGAL_ADVISOR_METRICS_LOG", "metrics.jsonl")
+PROMETHEUS_FILE_PATH = os.environ.get("LEGAL_ADVISOR_PROMETHEUS_FILE", "metrics.prom")
+# Set to serve /metrics over HTTP on this port
+METRICS_PORT = os.environ.get("LEGAL_ADVISOR_METRICS_PORT")
+# When set, the Streamlit app sends analyses to service.py at this URL instead of running them
+ANALYSIS_SERVICE_URL = os.environ.get("LEGAL_ADVISOR_SERVICE_URL")
+# Show per-stage latency percentiles in the sidebar
+ADMIN_PANEL = os.environ.get("LEGAL_ADVISOR_ADMIN", "") not in ("", "0", "false")
+
+# Define the prompt template for legal analysis (human-readable format)
+legal_analysis_template = """
+You are an experienced Indian legal advisor. Analyze the following case and provide clear, actionable advice in well-structured format:
+
+**Case Details:**
+{case_description}
+
+**Relevant Legal Provisions:**
+{legal_provisions}
+
+Please provide your analysis with these clear sections:
+
+1. **Case Summary**:
+   - Briefly summarize the key facts
+   - Identify the main legal issues
+
+2. **Applicable Laws**:
+   - List the most relevant laws/sections
+   - Explain how each law applies to this case
+   - Mention possible punishments/remedies
+
+3. **Recommended Actions**:
+   - Step-by-step advice on what to do next
+   - Suggested legal procedures to follow
+   - Any immediate precautions to take
+
+4. **Additional Considerations**:
+   - Potential challenges or complications
+   - Estimated timelines if relevant
+   - Suggestions for documentation/evidence
+
+Use clear headings, bullet points, and maintain a professional yet accessible tone. Focus on practical guidance rather than theoretical discussion.
+"""
+
+_lock = threading.RLock()
+_resources = {}
+
+# Seconds spent building each resource (including the resources it depends on),
+# recorded once when it is first created
+startup_timings = {}
+_init_state = {"depth": 0, "total": 0.0}
+
+def _get_or_create(name, factory):
+    if name in _resources:
+        return _resources[name]
+    with _lock:
+        if name not in _resources:
+            started = time.perf_counter()
+            _init_state["depth"] += 1
+            try:
+                _resources[name] = factory()
+            finally:
+                _init_state["depth"] -= 1
+            elapsed = time.perf_counter() - started
+            startup_timings[name] = elapsed
+            if _init_state["depth"] == 0:
+                _init_state["total"] += elapsed
+        return _resources[name]
+
+# Replace a resource, e.g. with a stand-in LLM or a temporary store in benchmarks
+def set_resource(name, resource):
+    with _lock:
+        _resources[name] = resource
+
+# Drop resources so they are rebuilt on next use (all of them when no names are given)
+def reset_resources(*names):
+    with _lock:
+        for name in names or list(_resources):
+            _resources.pop(name, None)
+
+# Build a Groq chat model; extra options (e.g. a pooled http_async_client) are passed through
+def create_llm(**options):
+    if GROQ_BASE_URL:
+        options.setdefault("base_url", GROQ_BASE_URL)
+    return ChatGroq(
+        temperature=0,
+        groq_api_key=GROQ_API_KEY,
+        model_name=MODEL_NAME,
+        **options
+    )
+
+def get_llm():
+    return _get_or_create("llm", create_llm)
+
+def get_chroma_client():
+    return _get_or_create("chroma_client", lambda: chromadb.PersistentClient(VECTORSTORE_PATH))
+
+def get_legal_collection():
+    return _get_or_create(
+        "legal_collection",
+        lambda: get_chroma_client().get_or_create_collection(name=COLLECTION_NAME)
+    )
+
+# Embedding model, loaded and warmed up once per process
+def get_embedding_service():
+    return _get_or_create(
+        "embedding_service",
+        lambda: EmbeddingService(cache_size=QUERY_EMBEDDING_CACHE_SIZE).warm_up()
+    )
+
+# Syncs the knowledge base into the collection once per process
+def get_knowledge_sync_report():
+    return _get_or_create("knowledge_sync", lambda: sync_legal_knowledge(
+        get_legal_collection(),
+        create_legal_knowledge_base(),
+        embed=get_embedding_service().embed_documents
+    ))
+
+def _export_vector_index(path, dtype):
+    get_knowledge_sync_report()
+    export_vector_index(
+        get_legal_collection(),
+        path,
+        dtype,
+        fingerprint=knowledge_base_fingerprint(create_legal_knowledge_base())
+    )
+    return VectorIndex(path)
+
+# Opens the saved snapshot without touching Chroma; it is only re-exported from
+# the collection when missing or built from a different knowledge base or dtype
+def _open_vector_index():
+    index = load_vector_index(VECTOR_INDEX_PATH)
+    if (
+        index is None
+        or index.dtype != VECTOR_INDEX_DTYPE
+        or index.fingerprint != knowledge_base_fingerprint(create_legal_knowledge_base())
+    ):
+        index = _export_vector_index(VECTOR_INDEX_PATH, VECTOR_INDEX_DTYPE)
+    return index
+
+def get_vector_index():
+    return _get_or_create("vector_index", _open_vector_index)
+
+# Re-export the snapshot after the collection changed outside the seed sync (e.g. ingest.py)
+def rebuild_vector_index(path=VECTOR_INDEX_PATH, dtype=VECTOR_INDEX_DTYPE):
+    index = _export_vector_index(path, dtype)
+    if path == VECTOR_INDEX_PATH:
+        set_resource("vector_index", index)
+        reset_resources("hybrid_retriever")
+    return index
+
+# Make the configured backend ready for queries: sync the collection, or open the
+# vector index snapshot (which only touches Chroma when it has to re-export)
+def prepare_retrieval_backend():
+    if RETRIEVAL_BACKEND == "numpy":
+        return get_vector_index()
+    get_knowledge_sync_report()
+    return get_legal_collection()
+
+def _build_hybrid_retriever():
+    if RETRIEVAL_BACKEND == "numpy":
+        return HybridRetriever(None, embedder=get_embedding_service(), vector_index=get_vector_index())
+    get_knowledge_sync_report()
+    return HybridRetriever(get_legal_collection(), embedder=get_embedding_service())
+
+def get_hybrid_retriever():
+    return _get_or_create("hybrid_retriever", _build_hybrid_retriever)
+
+def get_legal_analysis_prompt():
+    return _get_or_create("legal_analysis_prompt", lambda: PromptTemplate(
+        input_variables=["case_description", "legal_provisions"],
+        template=legal_analysis_template
+    ))
+
+def get_analysis_chain():
+    return _get_or_create("analysis_chain", lambda: get_legal_analysis_prompt() | get_llm())
+
+# Cache namespace: any change to the model, prompt, context budget or knowledge base
+# invalidates old entries
+def get_analysis_cache_namespace():
+    return _get_or_create("analysis_cache_namespace", lambda: fingerprint(
+        MODEL_NAME,
+        fingerprint(legal_analysis_template),
+        CONTEXT_TOKEN_BUDGET,
+        knowledge_base_fingerprint(create_legal_knowledge_base())
+    ))
+
+def get_analysis_cache():
+    return _get_or_create("analysis_cache", lambda: AnalysisCache(
+        ANALYSIS_CACHE_PATH,
+        get_analysis_cache_namespace(),
+        max_entries=ANALYSIS_CACHE_MAX_ENTRIES,
+        ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS,
+        similarity_threshold=float(ANALYSIS_CACHE_SIMILARITY) if ANALYSIS_CACHE_SIMILARITY else None
+    ))
+
+def _open_history_store():
+    store = HistoryStore(HISTORY_STORE_PATH)
+    store.migrate_json_dir(LEGACY_HISTORY_DIR)
+    return store
+
+def get_history_store():
+    return _get_or_create("history_store", _open_history_store)
+
+def _create_metrics_registry():
+    registry = MetricsRegistry(METRICS_LOG_PATH or None, PROMETHEUS_FILE_PATH or None)
+    if METRICS_PORT:
+        start_metrics_server(registry, int(METRICS_PORT))
+    return registry
+
+def get_metrics_registry():
+    return _get_or_create("metrics_registry", _create_metrics_registry)
+
+# Returns total one-off initialization time in seconds
+def total_startup_time():
+    return _init_state["total"]
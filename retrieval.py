@@ -0,0 +1,284 @@
+import argparse
+import math
+import re
+import statistics
+import time
+from collections import Counter, defaultdict
+from tracing import percentile
+
+# Provision retrieval: dense search through the Chroma collection, an in-memory
+# BM25 index over provision names and text, and an exact-match index of the
+# statute references (sections, articles, orders, rules) that appear in them.
+# The hybrid retriever fuses the three rankings with reciprocal rank fusion.
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "has", "have", "i", "in",
+    "is", "it", "its", "me", "my", "of", "on", "or", "that", "the", "their", "this", "to", "under",
+    "was", "were", "what", "with"
+}
+REFERENCE_PATTERN = re.compile(
+    r"\b(sections?|sec|articles?|art|orders?|rules?)\.?\s+(\d+[a-z]?)(?:\s*(?:-|–|to)\s*(\d+[a-z]?))?",
+    re.IGNORECASE
+)
+REFERENCE_KINDS = {"sec": "section", "art": "article"}
+# Ranges wider than this (e.g. "Sections 1-511") are indexed by their endpoints only
+MAX_REFERENCE_RANGE = 100
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+# Extract normalized references such as ("section", "154") or ("order", "13a")
+def extract_references(text):
+    references = set()
+    for kind, start, end in REFERENCE_PATTERN.findall(text):
+        kind = kind.lower().rstrip("s")
+        kind = REFERENCE_KINDS.get(kind, kind)
+        start = start.lower()
+        references.add((kind, start))
+        if not end:
+            continue
+        end = end.lower()
+        references.add((kind, end))
+        if start.isdigit() and end.isdigit() and 0 < int(end) - int(start) <= MAX_REFERENCE_RANGE:
+            references.update((kind, str(number)) for number in range(int(start), int(end) + 1))
+    return references
+
+def category_filter(categories):
+    if not categories:
+        return None
+    categories = list(categories)
+    if len(categories) == 1:
+        return {"category": categories[0]}
+    return {"category": {"$in": categories}}
+
+# Dense retrieval for many queries in a single collection.query call.
+# With an embedder, query vectors are computed (and cached) locally and passed to Chroma.
+def vector_search_batch(collection, queries, n_results, categories=None, embedder=None):
+    queries = list(queries)
+    if embedder is not None:
+        query_args = {"query_embeddings": embedder.embed_queries(queries)}
+    else:
+        query_args = {"query_texts": queries}
+    results = collection.query(
+        n_results=n_results,
+        where=category_filter(categories),
+        include=["documents", "metadatas", "distances"],
+        **query_args
+    )
+    batch = []
+    for ids, docs, metadatas, distances in zip(
+        results["ids"], results["documents"], results["metadatas"], results["distances"]
+    ):
+        batch.append([
+            {
+                "id": doc_id,
+                "provision": metadata["provision"],
+                "category": metadata.get("category"),
+                "content": doc,
+                "distance": distance
+            }
+            for doc_id, doc, metadata, distance in zip(ids, docs, metadatas, distances)
+        ])
+    return batch
+
+class BM25Index:
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.doc_lengths = []
+        for doc_index, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                self.postings[term][doc_index] = count
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        doc_count = len(self.doc_lengths)
+        self.idf = {
+            term: math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    # (doc_index, score) pairs, best first
+    def search(self, query, limit, allowed=None):
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            for doc_index, count in self.postings.get(term, {}).items():
+                if allowed is not None and doc_index not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / self.avg_length)
+                scores[doc_index] += self.idf[term] * count * (self.k1 + 1) / (count + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+class ReferenceIndex:
+    def __init__(self, names, texts):
+        self.index = defaultdict(dict)
+        for doc_index, (name, text) in enumerate(zip(names, texts)):
+            # A reference in the provision name is a stronger signal than one in its text
+            for reference in extract_references(text):
+                self.index[reference][doc_index] = 1.0
+            for reference in extract_references(name):
+                self.index[reference][doc_index] = 2.0
+
+    def search(self, query, limit, allowed=None):
+        scores = defaultdict(float)
+        for reference in extract_references(query):
+            for doc_index, weight in self.index.get(reference, {}).items():
+                if allowed is None or doc_index in allowed:
+                    scores[doc_index] += weight
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+def reciprocal_rank_fusion(rankings, k=60, weights=None):
+    scores = defaultdict(float)
+    for name, ranking in rankings.items():
+        weight = (weights or {}).get(name, 1.0)
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += weight / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+class HybridRetriever:
+    # Dense search runs against `vector_index` (a vector_index.VectorIndex) instead of
+    # the collection when one is given; it needs an embedder for the query vectors
+    def __init__(self, collection, candidates=20, rrf_k=60, weights=None, embedder=None, vector_index=None):
+        self.collection = collection
+        self.embedder = embedder
+        self.vector_index = vector_index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.weights = weights
+        if vector_index is not None:
+            # Provision text stays in the memory-mapped snapshot: it is decoded here to
+            # build the lexical indexes, and afterwards only for the rows returned
+            self.provisions = None
+            self.ids = list(vector_index.iter_strings("ids"))
+            categories = vector_index.iter_categories()
+            names = lambda: vector_index.iter_strings("provisions")
+            contents = lambda: vector_index.iter_strings("documents")
+        else:
+            stored = collection.get(include=["documents", "metadatas"])
+            self.provisions = [
+                {"id": doc_id, "provision": metadata["provision"], "category": metadata.get("category"), "content": doc}
+                for doc_id, doc, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+            ]
+            self.ids = [p["id"] for p in self.provisions]
+            categories = (p["category"] for p in self.provisions)
+            names = lambda: (p["provision"] for p in self.provisions)
+            contents = lambda: (p["content"] for p in self.provisions)
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.by_category = defaultdict(set)
+        for row, category in enumerate(categories):
+            self.by_category[category].add(row)
+        self.lexical = BM25Index(f"{name} {content}" for name, content in zip(names(), contents()))
+        self.references = ReferenceIndex(names(), contents())
+
+    def _provision(self, row):
+        if self.vector_index is not None:
+            return self.vector_index.provision(row)
+        return self.provisions[row]
+
+    def _allowed(self, categories):
+        if not categories:
+            return None
+        return set().union(*(self.by_category.get(category, set()) for category in categories))
+
+    def retrieve_batch(self, queries, top_n=8, categories=None):
+        queries = list(queries)
+        if not self.ids:
+            return [[] for _ in queries]
+        allowed = self._allowed(categories)
+        depth = min(max(self.candidates, top_n), len(self.ids))
+        if self.vector_index is not None:
+            dense = self.vector_index.search_batch(self.embedder.embed_queries(queries), depth, categories)
+        else:
+            dense = vector_search_batch(self.collection, queries, depth, categories, self.embedder)
+
+        batch = []
+        for query, vector_results in zip(queries, dense):
+            rankings = {
+                "vector": [p["id"] for p in vector_results],
+                "lexical": [self.ids[i] for i, _ in self.lexical.search(query, depth, allowed)],
+                "reference": [self.ids[i] for i, _ in self.references.search(query, depth, allowed)]
+            }
+            fused = reciprocal_rank_fusion(rankings, self.rrf_k, self.weights)
+            distances = {p["id"]: p["distance"] for p in vector_results}
+            references = set(rankings["reference"])
+            batch.append([
+                dict(
+                    self._provision(self.rows[doc_id]),
+                    distance=distances.get(doc_id),
+                    reference_match=doc_id in references
+                )
+                for doc_id in fused[:top_n]
+            ])
+        return batch
+
+    def retrieve(self, query, top_n=8, categories=None):
+        return self.retrieve_batch([query], top_n, categories)[0]
+
+# Labelled queries used to compare retrieval modes (expected provision names)
+EVALUATION_QUERIES = [
+    ("Police refused to register my FIR under Section 154", ["Criminal Procedure Code - FIR (Section 154)"]),
+    ("Can the court give summary judgment under Order 13A without trial?", ["Civil Procedure Code - Summary Judgment (Order 13A)"]),
+    ("Filing a writ petition under Article 32 against illegal detention", ["Right to Constitutional Remedies (Article 32)"]),
+    ("Government job rejected because of my caste, is this against Article 16?", ["Right to Equality (Articles 14-18)"]),
+    ("Article 21 right to life violated by police custody", ["Right to Freedom (Articles 19-22)"]),
+    ("Is bail a matter of right for a bailable offence under Section 437?", ["Criminal Procedure Code - Bail (Sections 436-450)"]),
+    ("Someone took my phone from my bag without asking, Section 378", ["Indian Penal Code - Theft (Section 378)"]),
+    ("Supplier did not deliver and I want compensation under Section 73", ["Indian Contract Act - Breach of Contract (Section 73)"]),
+    ("Seller delivered goods that are not of merchantable quality", ["Sale of Goods Act, 1930"]),
+    ("Do daughters get an equal share in ancestral property after 2005?", ["Hindu Succession Act, 1956 (as amended)"]),
+    ("Online shop refuses refund for a defective product worth Rs 50,000", ["Consumer Protection Act, 2019"]),
+    ("Someone hacked my email and is impersonating me online", ["Information Technology Act, 2000"]),
+    ("Neighbour blocked the path I have always used to reach my house", ["Indian Easements Act, 1882"]),
+    ("Department refused my request for information citing Section 8", ["Right to Information Act, 2005"]),
+    ("Sale deed for a flat was never registered, is it valid under Section 17?", ["Registration Act, 1908"]),
+    ("Employer is not depositing 12% provident fund contribution", ["Employees' Provident Funds Act, 1952"])
+]
+
+# Recall@k and per-query latency for a retrieve(query, top_n) function
+def evaluate_retrieval(retrieve, queries=EVALUATION_QUERIES, ks=(1, 3, 5, 8)):
+    top_n = max(ks)
+    hits = {k: 0 for k in ks}
+    latencies = []
+    for query, expected in queries:
+        started = time.perf_counter()
+        results = retrieve(query, top_n)
+        latencies.append(time.perf_counter() - started)
+        names = [p["provision"] for p in results]
+        for k in ks:
+            hits[k] += len(set(names[:k]) & set(expected)) / len(expected)
+    return {
+        "recall": {k: hits[k] / len(queries) for k in ks},
+        "latency_ms": {
+            "mean": statistics.mean(latencies) * 1000,
+            "p50": percentile(latencies, 0.5) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000
+        },
+        "per_query_ms": [round(latency * 1000, 3) for latency in latencies]
+    }
+
+def main():
+    from resources import get_knowledge_sync_report, get_legal_collection, get_hybrid_retriever, get_embedding_service
+
+    parser = argparse.ArgumentParser(description="Compare vector-only and hybrid provision retrieval.")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 8])
+    args = parser.parse_args()
+
+    get_knowledge_sync_report()
+    collection = get_legal_collection()
+    embedder = get_embedding_service()
+    hybrid = get_hybrid_retriever()
+    modes = {
+        "vector": lambda query, top_n: vector_search_batch(collection, [query], top_n, embedder=embedder)[0],
+        "hybrid": hybrid.retrieve
+    }
+    for mode, retrieve in modes.items():
+        retrieve("warm up", 1)
+        report = evaluate_retrieval(retrieve, ks=args.k)
+        recall = "  ".join(f"R@{k}={value:.2f}" for k, value in report["recall"].items())
+        latency = report["latency_ms"]
+        print(f"{mode:<7} {recall}  mean={latency['mean']:.1f}ms p50={latency['p50']:.1f}ms p95={latency['p95']:.1f}ms")
+
+if __name__ == "__main__":
+    main()
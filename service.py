@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import time
+import httpx
+from aiohttp import web
+from resources import (
+    legal_analysis_template,
+    create_llm,
+    get_legal_analysis_prompt,
+    get_analysis_cache,
+    prepare_retrieval_backend,
+    get_hybrid_retriever,
+    get_metrics_registry
+)
+from legal_advisor import retrieve_legal_provisions, prepare_analysis_inputs, record_token_usage
+from analysis_cache import normalize_case_description
+from tracing import trace_request, span
+
+# Headless async HTTP service around the analysis pipeline.
+# LLM calls go through one pooled keep-alive HTTP client, at most
+# `max_concurrency` analyses run at once with up to `max_queue` waiting, and
+# identical case descriptions that arrive while one is in flight share its
+# result instead of making their own LLM call.
+
+class QueueFullError(Exception):
+    pass
+
+class AnalysisService:
+    def __init__(self, chain, max_concurrency=16, max_queue=256, top_n=8):
+        self.chain = chain
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.top_n = top_n
+        self.stats = {"requests": 0, "coalesced": 0, "rejected": 0, "llm_calls": 0, "cache_hits": 0}
+        self._slots = asyncio.Semaphore(max_concurrency)
+        # Analyses running or waiting for a slot
+        self._pending = 0
+        self._in_flight = {}
+
+    async def analyze(self, case_description, categories=None):
+        self.stats["requests"] += 1
+        key = (normalize_case_description(case_description), tuple(sorted(categories or ())))
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            # Shielded so one caller disconnecting does not cancel the shared call
+            return dict(await asyncio.shield(task), coalesced=True)
+
+        if self._pending >= self.max_concurrency + self.max_queue:
+            self.stats["rejected"] += 1
+            raise QueueFullError(f"{self._pending - self.max_concurrency} analyses already queued")
+        self._pending += 1
+        task = asyncio.ensure_future(self._run(case_description, categories))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return dict(await asyncio.shield(task), coalesced=False)
+
+    async def _run(self, case_description, categories):
+        try:
+            async with self._slots:
+                with trace_request(get_metrics_registry(), "service"):
+                    started = time.perf_counter()
+                    metrics = {}
+                    provisions = await asyncio.to_thread(
+                        retrieve_legal_provisions, case_description, self.top_n, categories
+                    )
+                    # Packing and the SQLite cache run off the event loop
+                    inputs, provision_ids = await asyncio.to_thread(
+                        prepare_analysis_inputs, case_description, provisions, metrics
+                    )
+                    cache = get_analysis_cache()
+                    analysis = await asyncio.to_thread(cache.get, case_description, provision_ids)
+                    metrics["cached"] = analysis is not None
+                    if analysis is None:
+                        with span("llm"):
+                            response = await self.chain.ainvoke(inputs)
+                        self.stats["llm_calls"] += 1
+                        analysis = response.content
+                        record_token_usage(response.usage_metadata, legal_analysis_template.format(**inputs), analysis)
+                        await asyncio.to_thread(cache.put, case_description, provision_ids, analysis)
+                    else:
+                        self.stats["cache_hits"] += 1
+                    metrics["total"] = metrics["first_token"] = time.perf_counter() - started
+                    return {
+                        "analysis": analysis,
+                        "provisions": [p["provision"] for p in provisions],
+                        "metrics": metrics
+                    }
+        finally:
+            self._pending -= 1
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    case_description = (body.get("case_description") or "").strip()
+    if not case_description:
+        raise web.HTTPBadRequest(text="case_description is required")
+    return body, case_description
+
+async def handle_analyze(request):
+    body, case_description = await _read_json(request)
+    try:
+        result = await request.app["service"].analyze(case_description, body.get("categories"))
+    except QueueFullError as error:
+        return web.json_response({"error": str(error)}, status=503, headers={"Retry-After": "1"})
+    except Exception as error:
+        return web.json_response({"error": f"{type(error).__name__}: {error}"}, status=502)
+    return web.json_response(result)
+
+async def handle_provisions(request):
+    body, case_description = await _read_json(request)
+    provisions = await asyncio.to_thread(
+        retrieve_legal_provisions, case_description, int(body.get("top_n", 8)), body.get("categories")
+    )
+    return web.json_response({"provisions": [
+        dict(p, distance=None if p.get("distance") is None else float(p["distance"])) for p in provisions
+    ]})
+
+async def handle_health(request):
+    return web.json_response({"status": "ok", **request.app["service"].stats})
+
+async def handle_metrics(request):
+    return web.Response(text=get_metrics_registry().render_prometheus(), content_type="text/plain")
+
+def create_app(max_concurrency=16, max_queue=256, pool_size=32, llm_timeout=120.0):
+    app = web.Application()
+
+    async def on_startup(app):
+        app["http_client"] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(llm_timeout)
+        )
+        chain = get_legal_analysis_prompt() | create_llm(http_async_client=app["http_client"])
+        app["service"] = AnalysisService(chain, max_concurrency, max_queue)
+        # Sync the knowledge base and build the indexes before taking traffic
+        await asyncio.to_thread(prepare_retrieval_backend)
+        await asyncio.to_thread(get_hybrid_retriever)
+
+    async def on_cleanup(app):
+        await app["http_client"].aclose()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/analyze", handle_analyze)
+    app.router.add_post("/provisions", handle_provisions)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the legal analysis HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrency", type=int, default=16, help="analyses running at once")
+    parser.add_argument("--max-queue", type=int, default=256, help="analyses allowed to wait for a slot")
+    parser.add_argument("--pool-size", type=int, default=32, help="keep-alive connections to the LLM provider")
+    args = parser.parse_args()
+    web.run_app(create_app(args.max_concurrency, args.max_queue, args.pool_size), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import requests
+
+# Thin client for service.py, used by the Streamlit app when LEGAL_ADVISOR_SERVICE_URL is set.
+# One session is shared per process so connections to the service are kept alive.
+
+_session = requests.Session()
+
+class AnalysisServiceError(Exception):
+    pass
+
+def _post(base_url, path, payload, timeout):
+    response = _session.post(f"{base_url.rstrip('/')}{path}", json=payload, timeout=timeout)
+    if response.status_code != 200:
+        try:
+            message = response.json().get("error", response.text)
+        except ValueError:
+            message = response.text
+        raise AnalysisServiceError(f"Analysis service returned {response.status_code}: {message}")
+    return response.json()
+
+# Returns {"analysis": ..., "provisions": [...], "metrics": {...}, "coalesced": bool}
+def analyze_via_service(base_url, case_description, categories=None, timeout=180):
+    return _post(base_url, "/analyze", {"case_description": case_description, "categories": categories}, timeout)
+
+def get_provisions_via_service(base_url, case_description, top_n=8, categories=None, timeout=30):
+    payload = {"case_description": case_description, "top_n": top_n, "categories": categories}
+    return _post(base_url, "/provisions", payload, timeout)["provisions"]
@@ -0,0 +1,26 @@
+import json
+from batch_analysis import load_completed_ids, truncate_partial_line
+
+def test_partial_last_line_is_truncated_before_resuming(tmp_path):
+    output = tmp_path / "results.jsonl"
+    complete = [json.dumps({"id": str(i), "analysis": "done"}) for i in range(2, 21)]
+    output.write_text("\n".join(complete) + '\n{"id": "1", "analy', encoding="utf-8")
+
+    truncate_partial_line(str(output))
+    with open(output, "a") as f:
+        f.write(json.dumps({"id": "1", "analysis": "done"}) + "\n")
+
+    assert load_completed_ids(str(output)) == {str(i) for i in range(1, 21)}
+
+def test_complete_file_is_left_unchanged(tmp_path):
+    output = tmp_path / "results.jsonl"
+    content = json.dumps({"id": "1", "analysis": "done"}) + "\n"
+    output.write_text(content, encoding="utf-8")
+    truncate_partial_line(str(output))
+    assert output.read_text(encoding="utf-8") == content
+
+def test_file_with_only_a_partial_line_is_emptied(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text('{"id": "1", "ana', encoding="utf-8")
+    truncate_partial_line(str(output), block_size=4)
+    assert output.read_text(encoding="utf-8") == ""
@@ -0,0 +1,64 @@
+from context_packing import estimate_tokens, format_provision, pack_provisions
+
+# Section 154 CrPC is one long sentence, longer than the budgets used below
+SECTION_154 = (
+    "Every information relating to the commission of a cognizable offence, if given orally to an officer in "
+    "charge of a police station, shall be reduced to writing by him or under his direction, and be read over "
+    "to the informant; and every such information, whether given in writing or reduced to writing as "
+    "aforesaid, shall be signed by the person giving it, and the substance thereof shall be entered in a book "
+    "to be kept by such officer in such form as the State Government may prescribe in this behalf"
+)
+
+def provision(name, content, distance):
+    return {"provision": name, "content": content, "distance": distance}
+
+def test_single_provision_longer_than_budget_is_kept_as_fragment():
+    packed, stats = pack_provisions([provision("Section 154 CrPC", SECTION_154, 0.3)], token_budget=50)
+
+    assert len(packed) == 1
+    assert stats["truncated"] == 1
+    content = packed[0]["content"]
+    assert content.endswith("…") and len(content) < len(SECTION_154)
+    assert SECTION_154.startswith(content[:-1])
+
+def test_results_past_max_distance_are_dropped_after_min_provisions():
+    provisions = [
+        provision("Section 378 IPC", "Whoever intends to take dishonestly any movable property commits theft.", 1.6),
+        provision("Section 379 IPC", "Whoever commits theft shall be punished with imprisonment.", 1.7),
+        provision("Section 420 IPC", "Whoever cheats and thereby dishonestly induces delivery of property.", 1.8),
+        provision("Section 302 IPC", "Whoever commits murder shall be punished with death.", 1.9)
+    ]
+    packed, stats = pack_provisions(provisions, max_distance=1.4, distance_margin=1.0, min_provisions=2)
+
+    assert [p["provision"] for p in packed] == ["Section 378 IPC", "Section 379 IPC"]
+    assert stats["irrelevant"] == 2
+
+def test_near_duplicates_are_counted_as_redundant():
+    text = "Whoever commits theft shall be punished with imprisonment of either description for a term which may extend to three years"
+    provisions = [
+        provision("Section 379 IPC", text, 0.2),
+        provision("Section 379 IPC (amended)", text + ", or with fine", 0.25),
+        provision("Section 380 IPC", "Theft in a dwelling house, tent or vessel used for the custody of property.", 0.3)
+    ]
+    packed, stats = pack_provisions(provisions)
+
+    assert [p["provision"] for p in packed] == ["Section 379 IPC", "Section 380 IPC"]
+    assert stats["redundant"] == 1
+
+def test_packed_tokens_stay_within_budget():
+    # Distinct wording per provision so none of them is dropped as redundant
+    provisions = [
+        provision(
+            f"Section {number} CrPC",
+            " ".join(f"clause{number}x{word}" for word in range(120)) + ". " + SECTION_154,
+            0.2 + number / 100
+        )
+        for number in range(1, 13)
+    ]
+    token_budget = 400
+    packed, stats = pack_provisions(provisions, token_budget=token_budget, max_provision_tokens=150)
+
+    assert packed
+    assert sum(estimate_tokens(format_provision(p)) for p in packed) <= token_budget
+    assert stats["redundant"] == 0 and stats["over_budget"] > 0
+    assert stats["over_budget"] + len(packed) == len(provisions)
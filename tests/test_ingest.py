@@ -0,0 +1,65 @@
+import json
+from ingest import iter_file_chunks
+
+# Sections 154-156 of the Code of Criminal Procedure, 1973 as they come out of a
+# bare-act PDF: the amendment footnotes of a page land in the middle of Section 154
+CRPC_EXCERPT = """THE CODE OF CRIMINAL PROCEDURE, 1973
+CHAPTER XII
+INFORMATION TO THE POLICE AND THEIR POWERS TO INVESTIGATE
+154. Information in cognizable cases.—(1) Every information relating to the commission of a cognizable offence, if given orally to an officer in charge of a police station, shall be reduced to writing by him or under his direction, and be read over to the informant; and every such information, whether given in writing or reduced to writing as aforesaid, shall be signed by the person giving it, and the substance thereof shall be entered in a book to be kept by such officer in such form as the State Government may prescribe in this behalf:
+1[Provided that if the information is given by the woman against whom an offence is alleged to have been committed or attempted, then such information shall be recorded, by a woman police officer or any woman officer.]
+1. Ins. by Act 13 of 2013, s. 13 (w.e.f. 3-2-2013).
+2. Subs. by Act 5 of 2009, s. 8.
+(2) A copy of the information as recorded under sub-section (1) shall be given forthwith, free of cost, to the informant.
+(3) Any person aggrieved by a refusal on the part of an officer in charge of a police station to record the information referred to in sub-section (1) may send the substance of such information, in writing and by post, to the Superintendent of Police concerned.
+155. Information as to non-cognizable cases and investigation of such cases.—(1) When information is given to an officer in charge of a police station of the commission within the limits of such station of a non-cognizable offence, he shall enter or cause to be entered the substance of the information in a book to be kept by such officer, and refer the informant to the Magistrate.
+(2) No police officer shall investigate a non-cognizable case without the order of a Magistrate having power to try such case or commit the case for trial.
+156. Police officer's power to investigate cognizable case.—(1) Any officer in charge of a police station may, without the order of a Magistrate, investigate any cognizable case which a Court having jurisdiction over the local area within the limits of such station would have power to inquire into or try under the provisions of Chapter XIII.
+"""
+
+def test_bare_act_excerpt_chunks_by_section_without_footnotes(tmp_path):
+    (tmp_path / "crpc.txt").write_text(CRPC_EXCERPT, encoding="utf-8")
+    chunks = list(iter_file_chunks(str(tmp_path / "crpc.txt"), str(tmp_path)))
+
+    sections = [chunk["metadata"]["section"] for chunk in chunks]
+    assert [section for section in sections if section] == ["154", "155", "156"]
+    assert len({chunk["id"] for chunk in chunks}) == len(chunks)
+    assert not any("Subs. by Act" in chunk["document"] or "Ins. by Act" in chunk["document"] for chunk in chunks)
+
+    section_154 = next(chunk for chunk in chunks if chunk["metadata"]["section"] == "154")
+    assert section_154["metadata"]["provision"] == (
+        "THE CODE OF CRIMINAL PROCEDURE, 1973 - Information in cognizable cases (Section 154)"
+    )
+    assert section_154["metadata"]["category"] == "criminal_procedure"
+    # The body after the footnotes still belongs to Section 154
+    assert "(3) Any person aggrieved" in section_154["document"]
+
+def test_repeated_section_numbers_get_distinct_ids(tmp_path):
+    records = [
+        {"act": "Indian Contract Act, 1872", "section": "73", "title": "Compensation for loss", "text": "When a contract has been broken..."},
+        {"act": "Indian Contract Act, 1872", "section": "73", "title": "Compensation for loss", "text": "Explanation.—In estimating the loss..."}
+    ]
+    path = tmp_path / "contract.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in records), encoding="utf-8")
+    chunks = list(iter_file_chunks(str(path), str(tmp_path)))
+    assert len(chunks) == 2
+    assert chunks[0]["id"] != chunks[1]["id"]
+
+# Headings whose text happens to mention an amending Act, a w.e.f. date or "See"
+# are still headings: the ".—" delimiter sets them apart from footnotes
+HEADINGS_LIKE_FOOTNOTES = """THE CODE OF CRIMINAL PROCEDURE, 1973
+1. Short title, extent and commencement.—(1) This Act may be called the Code of Criminal Procedure, 1973 (w.e.f. 1-4-1974).
+2. Repeal and savings.—(1) The Indian Penal Code as amended by Act 45 of 1860 is hereby repealed.
+1. Subs. by Act 5 of 2009, s. 8.
+3. See section 5.—Nothing in this Code shall affect any special or local law.
+"""
+
+def test_headings_that_look_like_footnotes_start_their_own_section(tmp_path):
+    (tmp_path / "crpc.txt").write_text(HEADINGS_LIKE_FOOTNOTES, encoding="utf-8")
+    chunks = list(iter_file_chunks(str(tmp_path / "crpc.txt"), str(tmp_path)))
+
+    assert [chunk["metadata"]["section"] for chunk in chunks] == ["1", "2", "3"]
+    assert "Repeal and savings" not in chunks[0]["document"]
+    assert "Repeal and savings" in chunks[1]["document"]
+    assert "See section 5" in chunks[2]["document"]
+    assert not any("Subs. by Act" in chunk["document"] for chunk in chunks)
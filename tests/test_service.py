@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from langchain_groq import ChatGroq
+from resources import set_resource, reset_resources, get_legal_analysis_prompt
+from analysis_cache import AnalysisCache
+from tracing import MetricsRegistry
+from fake_llm import create_mock_llm_app
+from service import AnalysisService, handle_analyze
+
+# AnalysisService against the mock Groq endpoint in fake_llm.py, with a fixed
+# retriever in place of the Chroma collection
+
+class StaticRetriever:
+    def retrieve_batch(self, queries, top_n=8, categories=None):
+        provision = {
+            "id": "prov-fir",
+            "provision": "Criminal Procedure Code - FIR (Section 154)",
+            "category": "criminal_procedure",
+            "content": "Every information relating to the commission of a cognizable offence shall be reduced to writing.",
+            "distance": 0.4
+        }
+        return [[dict(provision)] for _ in queries]
+
+@pytest.fixture
+def service_resources(tmp_path, monkeypatch):
+    monkeypatch.setattr("legal_advisor.RETRIEVAL_MODE", "hybrid")
+    set_resource("hybrid_retriever", StaticRetriever())
+    set_resource("analysis_cache", AnalysisCache(str(tmp_path / "cache.sqlite3"), "test"))
+    set_resource("metrics_registry", MetricsRegistry())
+    yield
+    reset_resources()
+
+async def start_mock_llm(first_token_latency):
+    server = TestServer(create_mock_llm_app(first_token_latency=first_token_latency, output_tokens=20))
+    await server.start_server()
+    return server
+
+def create_service(mock_llm, **options):
+    llm = ChatGroq(
+        temperature=0,
+        groq_api_key="test",
+        model_name="mock",
+        base_url=str(mock_llm.make_url("")).rstrip("/"),
+        max_retries=0
+    )
+    return AnalysisService(get_legal_analysis_prompt() | llm, **options)
+
+def test_identical_concurrent_requests_share_one_llm_call(service_resources):
+    async def scenario():
+        mock_llm = await start_mock_llm(0.3)
+        try:
+            service = create_service(mock_llm)
+            descriptions = ["Police refused to register my FIR", "police refused to register  my FIR!"] * 5
+            results = await asyncio.gather(*(service.analyze(description) for description in descriptions))
+            return service.stats, mock_llm.app["stats"], results
+        finally:
+            await mock_llm.close()
+
+    stats, mock_stats, results = asyncio.run(scenario())
+    assert mock_stats["requests"] == 1
+    assert stats["llm_calls"] == 1
+    assert stats["coalesced"] == 9
+    assert sum(not result["coalesced"] for result in results) == 1
+    assert len({result["analysis"] for result in results}) == 1
+
+def test_requests_beyond_the_queue_are_rejected_with_503(service_resources):
+    async def scenario():
+        mock_llm = await start_mock_llm(0.5)
+        app = web.Application()
+        app["service"] = create_service(mock_llm, max_concurrency=1, max_queue=1)
+        app.router.add_post("/analyze", handle_analyze)
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        try:
+            responses = await asyncio.gather(*(
+                client.post("/analyze", json={"case_description": f"Distinct case number {i}"}) for i in range(3)
+            ))
+            return [(response.status, response.headers.get("Retry-After")) for response in responses], app["service"].stats
+        finally:
+            await client.close()
+            await mock_llm.close()
+
+    responses, stats = asyncio.run(scenario())
+    assert sorted(status for status, _ in responses) == [200, 200, 503]
+    assert [retry_after for status, retry_after in responses if status == 503] == ["1"]
+    assert stats["rejected"] == 1
+    assert stats["llm_calls"] == 2
+
+def test_cancelled_caller_does_not_cancel_the_shared_call(service_resources):
+    async def scenario():
+        mock_llm = await start_mock_llm(0.3)
+        try:
+            service = create_service(mock_llm)
+            first = asyncio.ensure_future(service.analyze("Landlord kept my security deposit"))
+            await asyncio.sleep(0.05)
+            second = asyncio.ensure_future(service.analyze("Landlord kept my security deposit"))
+            await asyncio.sleep(0.05)
+            first.cancel()
+            result = await second
+            return result, service.stats, first.cancelled()
+        finally:
+            await mock_llm.close()
+
+    result, stats, cancelled = asyncio.run(scenario())
+    assert cancelled
+    assert result["coalesced"] is True
+    assert result["analysis"].startswith("## Case Summary")
+    assert stats["llm_calls"] == 1
@@ -0,0 +1,228 @@
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-request tracing of the analysis pipeline.
+# A trace is opened around each analysis; code inside it wraps its stages in
+# span(...) and attaches counts with annotate(...). Finished traces go to a
+# MetricsRegistry, which keeps recent stage latencies for percentiles and
+# Prometheus text export. A background thread appends one JSON line per request
+# to a log file and rewrites the Prometheus snapshot every `flush_interval`
+# seconds, so recording a trace never waits on disk (e.g. on the service's
+# event loop).
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current_trace = contextvars.ContextVar("legal_advisor_trace", default=None)
+
+class RequestTrace:
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = time.time()
+        self.duration = None
+        self.spans = {}
+        self.attributes = {}
+        self.error = None
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[stage] = self.spans.get(stage, 0.0) + time.perf_counter() - started
+
+    def to_dict(self):
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "duration_ms": round(self.duration * 1000, 3),
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self.spans.items()},
+            "error": self.error,
+            **self.attributes
+        }
+
+# Open a trace for one request, or join the one already open in this context
+@contextmanager
+def trace_request(registry, name="analysis"):
+    active = _current_trace.get()
+    if active is not None:
+        yield active
+        return
+
+    trace = RequestTrace(name)
+    token = _current_trace.set(trace)
+    started = time.perf_counter()
+    try:
+        yield trace
+    except BaseException as error:
+        if not isinstance(error, GeneratorExit):
+            trace.error = type(error).__name__
+        raise
+    finally:
+        trace.duration = time.perf_counter() - started
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            pass  # generator closed from another context
+        registry.record(trace)
+
+@contextmanager
+def span(stage):
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(stage):
+        yield
+
+def annotate(**attributes):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+# Stage time measured outside the trace, e.g. a share of a retrieval batched across requests
+def record_span(stage, seconds):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.spans[stage] = trace.spans.get(stage, 0.0) + seconds
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class MetricsRegistry:
+    def __init__(self, log_path=None, prometheus_path=None, window=2000, flush_interval=1.0):
+        self.log_path = log_path
+        self.prometheus_path = prometheus_path
+        self.flush_interval = flush_interval
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.stage_sums = defaultdict(float)
+        self.stage_counts = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.counters = defaultdict(int)
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._unwritten = []
+        self._dirty = False
+        self._flusher = None
+
+    def record(self, trace):
+        stages = dict(trace.spans, total=trace.duration)
+        with self._lock:
+            self.counters["requests"] += 1
+            for key in ("prompt_tokens", "completion_tokens", "provisions_retrieved"):
+                self.counters[key] += trace.attributes.get(key) or 0
+            if trace.error:
+                self.errors[trace.error] += 1
+            for stage, seconds in stages.items():
+                self.latencies[stage].append(seconds)
+                self.stage_sums[stage] += seconds
+                self.stage_counts[stage] += 1
+
+            if self.log_path:
+                self._unwritten.append(json.dumps(trace.to_dict()))
+            self._dirty = True
+            if self._flusher is None and (self.log_path or self.prometheus_path):
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    # Write out traces recorded since the last flush
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                lines, self._unwritten = self._unwritten, []
+                dirty, self._dirty = self._dirty, False
+            if lines:
+                with open(self.log_path, "a") as f:
+                    f.write("\n".join(lines) + "\n")
+            if dirty and self.prometheus_path:
+                self._write_prometheus()
+
+    # {stage: {"count": n, "p50_ms": ..., "p95_ms": ..., "p99_ms": ...}}
+    def stage_summary(self):
+        with self._lock:
+            snapshot = {stage: list(values) for stage, values in self.latencies.items() if values}
+            counts = dict(self.stage_counts)
+        return {
+            stage: {
+                "count": counts[stage],
+                **{f"p{int(q * 100)}_ms": round(percentile(values, q) * 1000, 1) for q in QUANTILES}
+            }
+            for stage, values in snapshot.items()
+        }
+
+    def render_prometheus(self):
+        with self._lock:
+            snapshot = {stage: list(values) for stage, values in self.latencies.items() if values}
+            lines = [
+                "# HELP legal_advisor_stage_seconds Latency of each analysis stage.",
+                "# TYPE legal_advisor_stage_seconds summary"
+            ]
+            for stage, values in snapshot.items():
+                for q in QUANTILES:
+                    lines.append(f'legal_advisor_stage_seconds{{stage="{stage}",quantile="{q}"}} {percentile(values, q):.6f}')
+                lines.append(f'legal_advisor_stage_seconds_sum{{stage="{stage}"}} {self.stage_sums[stage]:.6f}')
+                lines.append(f'legal_advisor_stage_seconds_count{{stage="{stage}"}} {self.stage_counts[stage]}')
+
+            lines += [
+                "# HELP legal_advisor_requests_total Analysis requests traced.",
+                "# TYPE legal_advisor_requests_total counter",
+                f"legal_advisor_requests_total {self.counters['requests']}",
+                "# HELP legal_advisor_errors_total Failed requests by exception type.",
+                "# TYPE legal_advisor_errors_total counter"
+            ]
+            lines += [f'legal_advisor_errors_total{{type="{name}"}} {count}' for name, count in self.errors.items()]
+            for key, description in (
+                ("prompt_tokens", "Prompt tokens sent to the LLM."),
+                ("completion_tokens", "Completion tokens received from the LLM."),
+                ("provisions_retrieved", "Provisions retrieved for analyses.")
+            ):
+                lines += [
+                    f"# HELP legal_advisor_{key}_total {description}",
+                    f"# TYPE legal_advisor_{key}_total counter",
+                    f"legal_advisor_{key}_total {self.counters[key]}"
+                ]
+        return "\n".join(lines) + "\n"
+
+    def _write_prometheus(self):
+        temporary = f"{self.prometheus_path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(temporary, self.prometheus_path)
+
+# Serve the registry at http://host:port/metrics from a daemon thread
+def start_metrics_server(registry, port, host="0.0.0.0"):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
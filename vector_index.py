@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+# In-memory retrieval backend: a read-only snapshot of the Chroma collection.
+# Embeddings are stored as one float16 (or int8 + per-row scale) matrix and
+# memory-mapped on load, so opening the index costs almost nothing and the OS
+# pages the matrix in on first use. Search is exact: one matrix product against
+# the query vectors, then argpartition for the top k. Distances are squared L2,
+# the same space the Chroma collection uses, so relevance thresholds carry over.
+# Ids, provision names and documents are kept in flat UTF-8 files with offset
+# arrays and only decoded for the rows that are returned. That holds for the
+# "vector" retrieval mode; in "hybrid" mode the BM25 and reference indexes are
+# still built over every document when the retriever is first created.
+#
+# Index directory layout:
+#   manifest.json                  count, dimensions, dtype, categories, fingerprint
+#   embeddings.npy                 (count, dimensions) float32 / float16 / int8
+#   scales.npy                     per-row dequantization scale (int8 only)
+#   norms.npy                      squared L2 norm of each original embedding
+#   categories.npy                 uint16 code into manifest["categories"]
+#   {ids,provisions,documents}.bin + .offsets.npy
+
+INDEX_FORMAT = 1
+DTYPES = ("float32", "float16", "int8")
+STRING_FIELDS = ("ids", "provisions", "documents")
+# Rows converted to float32 at a time when scoring a float16/int8 matrix
+SCORE_BLOCK_ROWS = 16384
+
+def quantize(embeddings, dtype):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dtype == "int8":
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(embeddings / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    return embeddings.astype(dtype), None
+
+class _StringWriter:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(f"{path}.bin", "wb")
+        self.offsets = [0]
+
+    def extend(self, strings):
+        for string in strings:
+            self.offsets.append(self.offsets[-1] + self.file.write(string.encode("utf-8")))
+
+    def close(self):
+        self.file.close()
+        np.save(f"{self.path}.offsets.npy", np.asarray(self.offsets, dtype=np.int64))
+
+class _StringArray:
+    def __init__(self, path):
+        self.offsets = np.load(f"{path}.offsets.npy", mmap_mode="r")
+        size = os.path.getsize(f"{path}.bin")
+        self.data = np.memmap(f"{path}.bin", dtype=np.uint8, mode="r") if size else np.zeros(0, np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+# Write a snapshot of `collection` (with its stored embeddings) to `path`.
+# The new index is built next to the old one and swapped in when complete.
+def export_vector_index(collection, path, dtype="float16", fingerprint=None, page_size=4000):
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}")
+    staging = f"{path}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    writers = {field: _StringWriter(os.path.join(staging, field)) for field in STRING_FIELDS}
+    matrices, scales, norms, codes = [], [], [], []
+    categories = {}
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset
+        )
+        if len(page["ids"]):
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            matrix, page_scales = quantize(embeddings, dtype)
+            matrices.append(matrix)
+            if page_scales is not None:
+                scales.append(page_scales)
+            norms.append(np.einsum("ij,ij->i", embeddings, embeddings))
+            metadatas = [metadata or {} for metadata in page["metadatas"]]
+            codes.extend(
+                categories.setdefault(metadata.get("category"), len(categories)) for metadata in metadatas
+            )
+            writers["ids"].extend(page["ids"])
+            writers["provisions"].extend(metadata.get("provision", "") for metadata in metadatas)
+            writers["documents"].extend(doc or "" for doc in page["documents"])
+        if len(page["ids"]) < page_size:
+            break
+        offset += page_size
+
+    for writer in writers.values():
+        writer.close()
+    dimensions = matrices[0].shape[1] if matrices else 0
+    np.save(
+        os.path.join(staging, "embeddings.npy"),
+        np.concatenate(matrices) if matrices else np.zeros((0, 0), dtype=dtype)
+    )
+    if dtype == "int8":
+        np.save(os.path.join(staging, "scales.npy"), np.concatenate(scales) if scales else np.zeros(0, np.float32))
+    np.save(os.path.join(staging, "norms.npy"), np.concatenate(norms) if norms else np.zeros(0, np.float32))
+    np.save(os.path.join(staging, "categories.npy"), np.asarray(codes, dtype=np.uint16))
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump({
+            "format": INDEX_FORMAT,
+            "count": len(codes),
+            "dimensions": dimensions,
+            "dtype": dtype,
+            "categories": list(categories),
+            "fingerprint": fingerprint,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    return path
+
+class VectorIndex:
+    def __init__(self, path):
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != INDEX_FORMAT:
+            raise ValueError(f"Unsupported vector index format in {path}")
+        self.path = path
+        self.fingerprint = self.manifest.get("fingerprint")
+        self.dtype = self.manifest["dtype"]
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.scales = np.load(os.path.join(path, "scales.npy")) if self.dtype == "int8" else None
+        self.norms = np.load(os.path.join(path, "norms.npy"))
+        self.category_codes = np.load(os.path.join(path, "categories.npy"))
+        self.category_ids = {category: code for code, category in enumerate(self.manifest["categories"])}
+        self.strings = {field: _StringArray(os.path.join(path, field)) for field in STRING_FIELDS}
+
+    def __len__(self):
+        return len(self.category_codes)
+
+    def nbytes(self):
+        return sum(
+            os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path)
+        )
+
+    def _category_mask(self, categories):
+        if not categories:
+            return None
+        codes = [self.category_ids[category] for category in categories if category in self.category_ids]
+        return np.isin(self.category_codes, codes)
+
+    # Inner products of every row with every query, shape (count, queries)
+    def _scores(self, queries):
+        if self.dtype == "float32":
+            return self.embeddings @ queries.T
+        scores = np.empty((len(self), len(queries)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            block = np.asarray(self.embeddings[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ queries.T
+        if self.scales is not None:
+            scores *= self.scales[:, None]
+        return scores
+
+    def provision(self, row, distance=None):
+        return {
+            "id": self.strings["ids"][row],
+            "provision": self.strings["provisions"][row],
+            "category": self.manifest["categories"][self.category_codes[row]],
+            "content": self.strings["documents"][row],
+            "distance": distance
+        }
+
+    def iter_strings(self, field):
+        strings = self.strings[field]
+        return (strings[row] for row in range(len(strings)))
+
+    def iter_categories(self):
+        names = self.manifest["categories"]
+        return (names[code] for code in self.category_codes)
+
+    # Exact top-k for a batch of query embeddings, in the same shape as vector_search_batch
+    def search_batch(self, query_embeddings, n_results, categories=None):
+        if not len(self) or n_results <= 0:
+            return [[] for _ in query_embeddings]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        distances = self.norms[:, None] + np.einsum("ij,ij->i", queries, queries)[None, :] - 2 * self._scores(queries)
+        mask = self._category_mask(categories)
+        if mask is not None:
+            distances[~mask] = np.inf
+        available = len(self) if mask is None else int(mask.sum())
+        k = min(n_results, available)
+        if not k:
+            return [[] for _ in queries]
+
+        distances = distances.T
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        batch = []
+        for query_distances, rows in zip(distances, top):
+            rows = rows[np.argsort(query_distances[rows], kind="stable")]
+            batch.append([self.provision(int(row), float(max(query_distances[row], 0.0))) for row in rows])
+        return batch
+
+def load_vector_index(path):
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        return None
+    return VectorIndex(path)
+
+def main():
+    from resources import VECTOR_INDEX_DTYPE, VECTOR_INDEX_PATH, rebuild_vector_index
+
+    parser = argparse.ArgumentParser(description="Export the legal knowledge collection to an in-memory vector index.")
+    parser.add_argument("--path", default=VECTOR_INDEX_PATH)
+    parser.add_argument("--dtype", choices=DTYPES, default=VECTOR_INDEX_DTYPE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = rebuild_vector_index(args.path, args.dtype)
+    print(
+        f"Wrote {len(index)} provisions ({index.dtype}, {index.nbytes() / 1e6:.1f} MB) to {args.path} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+if __name__ == "__main__":
+    main()